@@ -1,6 +1,6 @@
 {
     'name': 'SU SMS - Africa\'s Talking',
-    'version': '19.0.1.0',
+    'version': '19.0.1.1',
     'summary': 'Strathmore University SMS via Africa\'s Talking - mass, staff, student, ad-hoc, manual',
     'category': 'Hidden/Tools',
     'description': """
@@ -43,6 +43,7 @@ Features
     'views/su_sms_message_views.xml',
     'views/su_sms_dashboard_views.xml',
     'views/su_sms_reporting_views.xml',
+    'views/su_sms_ws_cache_views.xml',
 
     # Menu MUST be last
     'views/su_sms_menu.xml',
@@ -55,7 +56,7 @@ Features
         ],
     },
     'external_dependencies': {
-        'python': ['requests'],
+        'python': ['requests'],  # phonenumbers is optional (tools/phone_check.py)
     },
     'installable': True,
     'application': False,  # Not standalone; extends sms module
@@ -17,6 +17,9 @@ from odoo.http import request
 
 _logger = logging.getLogger(__name__)
 
+# Largest page the recipient preview endpoint will render
+PREVIEW_MAX_LIMIT = 500
+
 
 class SuSmsController(http.Controller):
 
@@ -94,11 +97,45 @@ class SuSmsController(http.Controller):
         return {
             'messages':   messages,
             'dept_stats': dept_stats,
+            'circuits':   env['su.sms.circuit.breaker'].get_dashboard_states(),
+            'ws_cache':   env['su.sms.ws.cache'].sudo().get_cache_metrics() if is_manager else False,
             'total_sent': sum(m['success_count'] for m in messages),
             'total_cost': sum(m['total_cost']    for m in messages),
             'is_manager': is_manager,
         }
 
+    # ------------------------------------------------------------------
+    # Compose wizard recipient preview (paginated)
+    # ------------------------------------------------------------------
+    @http.route(
+        '/su_sms/recipient_preview',
+        type='jsonrpc',       # internal authenticated call from the compose form
+        auth='user',
+        methods=['POST'],
+    )
+    def get_recipient_preview(self, wizard_id, offset=0, limit=50, search=None, **kwargs):
+        """
+        One page of the recipients a saved su.sms.compose wizard would send
+        to, for any SMS type. Manual / ad hoc lists come from the parsed
+        recipient cache; staff / student lists from the data service, cached
+        so that Send reuses them.
+
+        Only users allowed to send this SMS type (and, for staff
+        administrators, to this department) may preview it; others get the
+        UserError raised by _check_sms_access.
+
+        Response:
+            {'total': 20412, 'offset': 0, 'limit': 50,
+             'records': [{'index': 1, 'name': 'Jane Doe', 'number': '+2547...'}, ...]}
+        """
+        wizard = request.env['su.sms.compose'].browse(int(wizard_id)).exists()
+        if not wizard:
+            return {'error': 'Compose wizard not found.'}
+        wizard.check_access('read')
+        offset = max(int(offset or 0), 0)
+        limit  = min(max(int(limit or 50), 1), PREVIEW_MAX_LIMIT)
+        return wizard._get_preview_page(offset=offset, limit=limit, search=search)
+
     # ------------------------------------------------------------------
     # Ad Hoc CSV template download
     # ------------------------------------------------------------------
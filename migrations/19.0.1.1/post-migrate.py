@@ -0,0 +1,71 @@
+# migrations/19.0.1.1/post-migrate.py
+
+"""
+Backfill su_sms_detail.phone_e164 and carrier for details created before
+they were filled on ingestion, BACKFILL_BATCH rows per UPDATE, walking the
+table by id so memory stays flat on large histories.
+
+Campaigns created before su_sms_message.company_id existed get the company
+of the user who created them.
+
+The extra send-queue worker crons (noupdate data, so not removed by the
+update itself) are deleted; a single cron now drains the queue.
+"""
+
+import logging
+
+from odoo import SUPERUSER_ID, api
+
+from odoo.addons.su_sms_integrated.tools.phone_check import check_phone_numbers, phone_e164
+
+_logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH = 50000
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    for xmlid in ('ir_cron_su_sms_send_queue_2', 'ir_cron_su_sms_send_queue_3'):
+        cron = env.ref(f'su_sms_integrated.{xmlid}', raise_if_not_found=False)
+        if cron:
+            cron.unlink()
+    cr.execute("""
+        UPDATE su_sms_message m
+           SET company_id = u.company_id
+          FROM res_users u
+         WHERE u.id = m.create_uid
+           AND m.company_id IS NULL
+    """)
+    last_id = 0
+    total = 0
+    while True:
+        cr.execute("""
+            SELECT id, phone_number
+              FROM su_sms_detail
+             WHERE id > %s
+               AND phone_e164 IS NULL
+               AND phone_number IS NOT NULL
+             ORDER BY id
+             LIMIT %s
+        """, [last_id, BACKFILL_BATCH])
+        rows = cr.fetchall()
+        if not rows:
+            break
+        ids, numbers = zip(*rows)
+        checks = check_phone_numbers(numbers)
+        cr.execute("""
+            UPDATE su_sms_detail d
+               SET phone_e164 = v.phone_e164,
+                   carrier = COALESCE(d.carrier, v.carrier)
+              FROM unnest(%s::int[], %s::varchar[], %s::varchar[]) AS v(id, phone_e164, carrier)
+             WHERE d.id = v.id
+        """, [
+            list(ids),
+            [phone_e164(check) for check in checks],
+            [check.carrier or None for check in checks],
+        ])
+        total += len(ids)
+        last_id = ids[-1]
+        _logger.info("SU SMS migration: phone_e164 backfilled for %d details", total)
@@ -0,0 +1,15 @@
+# migrations/19.0.1.1/pre-migrate.py
+
+"""
+Create su_sms_detail.phone_e164 ahead of the ORM.
+
+A new stored computed column would be computed for every existing detail in
+one pass during the upgrade; with the column already present the ORM leaves
+it alone and post-migrate backfills it in chunks instead.
+"""
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    cr.execute("ALTER TABLE su_sms_detail ADD COLUMN IF NOT EXISTS phone_e164 varchar")
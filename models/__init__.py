@@ -5,6 +5,11 @@ from . import (
     res_config_settings,
     sms_sms,
     sms_tracker,
+    su_sms_batch_tuning,
+    su_sms_circuit_breaker,
+    su_sms_directory,
+    su_sms_rate_bucket,
+    su_sms_ws_cache,
     su_sms_department,
     su_sms_administrator,
     su_sms_message,
@@ -52,6 +52,62 @@ class ResCompany(models.Model):
         groups='base.group_system',
     )
 
+    # ------------------------------------------------------------------
+    # AT bulk sending performance
+    # ------------------------------------------------------------------
+    at_send_concurrency = fields.Integer(
+        string='AT Parallel Requests',
+        default=4,
+        groups='base.group_system',
+        help="Maximum number of Africa's Talking bulk requests (chunks of up to "
+             "500 recipients) sent in parallel. Set to 1 to send chunks one at a time.",
+    )
+    at_transport = fields.Selection(
+        string='AT Transport',
+        selection=[
+            ('native', 'Pooled HTTP connection'),
+            ('sdk', "Africa's Talking SDK"),
+        ],
+        default='native',
+        groups='base.group_system',
+        help="Pooled HTTP keeps connections to Africa's Talking open between "
+             "requests. The SDK opens a new connection for every request and is "
+             "kept as a fallback.",
+    )
+    at_send_engine = fields.Selection(
+        string='AT Send Engine',
+        selection=[
+            ('threads', 'Thread pool'),
+            ('async', 'Asynchronous (very large campaigns)'),
+        ],
+        default='threads',
+        groups='base.group_system',
+        help="The asynchronous engine keeps many requests in flight from a "
+             "single thread and requires the aiohttp Python package. Without "
+             "it, or with the SDK transport, the thread pool is used.",
+    )
+    at_async_window = fields.Integer(
+        string='AT In-flight Requests',
+        default=32,
+        groups='base.group_system',
+        help="Maximum number of bulk requests in flight at once with the "
+             "asynchronous engine.",
+    )
+    at_rate_messages = fields.Integer(
+        string='AT Messages per Second',
+        default=0,
+        groups='base.group_system',
+        help="Maximum recipients per second sent to Africa's Talking by all "
+             "Odoo workers together. 0 means no limit.",
+    )
+    at_rate_requests = fields.Integer(
+        string='AT Requests per Second',
+        default=0,
+        groups='base.group_system',
+        help="Maximum Africa's Talking API calls per second by all Odoo "
+             "workers together. 0 means no limit.",
+    )
+
     # ------------------------------------------------------------------
     # LDAP config (soft - shown when auth_ldap installed)
     # ------------------------------------------------------------------
@@ -15,6 +15,7 @@ class SmsSms(models.Model):
             ('at_insufficient_balance', "Africa's Talking Insufficient Balance"),
             ('at_invalid_sender', "Africa's Talking Invalid Sender ID"),
             ('at_number_format', "Africa's Talking Invalid Phone Number"),
+            ('at_rejected', "Africa's Talking Rejected"),
         ],
     )
 
@@ -42,6 +43,25 @@ class SmsSms(models.Model):
             )
         return super().create(vals_list)
 
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+    def _split_batch(self):
+        """
+        SU campaign SMS are already claimed in bounded queue chunks
+        (su_sms.queue_chunk_size), so each send is passed to SmsApiAT as one
+        batch. Splitting it into sms.session.batch.size (500) batches would
+        hand _send_sms_batch a single AT_BATCH_MAX chunk at a time and
+        leave its parallel / async dispatch with nothing to overlap.
+        Other SMS keep the standard session batches.
+        """
+        campaign_sms = self.filtered('su_message_id')
+        if campaign_sms:
+            yield campaign_sms.ids
+        others = self - campaign_sms
+        if others:
+            yield from super(SmsSms, others)._split_batch()
+
     # ------------------------------------------------------------------
     # Provider routing - mirrors sms_twilio._split_by_api exactly
     # ------------------------------------------------------------------
@@ -77,38 +97,32 @@ class SmsSms(models.Model):
         """
         After batch send, update su.sms.detail records that are linked
         to SU SMS campaigns with per-recipient status from AT.
+        Details are resolved with one search and updated in bulk
+        (see su.sms.detail._apply_send_results).
         """
         at_sms = self.filtered(
             lambda s: s._get_sms_company().sms_provider == 'africas_talking'
         )
         if at_sms:
             grouped = at_sms.grouped('uuid')
+            campaign_results = {}
             for result in results:
                 sms = grouped.get(result.get('uuid'))
                 if sms and sms.su_message_id:
-                    # Update the corresponding su.sms.detail
-                    detail = self.env['su.sms.detail'].search([
-                        ('message_id', '=', sms.su_message_id.id),
-                        ('sms_uuid', '=', result.get('uuid')),
-                    ], limit=1)
-                    if detail:
-                        state_map = {
-                            'sent': 'sent',
-                            'pending': 'sent',
-                            'process': 'sent',
-                        }
-                        new_state = (
-                            state_map.get(result.get('state'))
-                            or ('failed' if result.get('failure_type') else 'sent')
-                        )
-                        detail.write({
-                            'status': new_state,
-                            'failure_reason': result.get('failure_reason') or False,
-                            'at_message_id': result.get('at_message_id') or False,
-                            'cost': result.get('credit') or 0.0,
-                        })
-                        # Trigger expenditure update on success
-                        if new_state == 'sent':
-                            sms.su_message_id._update_department_expenditure(detail)
+                    campaign_results[(sms.su_message_id.id, result['uuid'])] = result
+
+            if campaign_results:
+                details = self.env['su.sms.detail'].search([
+                    ('sms_uuid', 'in', [uuid for _message_id, uuid in campaign_results]),
+                ])
+                updates = []
+                for detail in details:
+                    result = campaign_results.get((detail.message_id.id, detail.sms_uuid))
+                    if result:
+                        updates.append((detail, result))
+                sent = self.env['su.sms.detail']._apply_send_results(updates)
+                # Trigger expenditure update on success
+                for message, message_sent in sent.grouped('message_id').items():
+                    message._update_department_expenditure(message_sent)
 
         super(SmsSms, self - at_sms)._handle_call_result_hook(results)
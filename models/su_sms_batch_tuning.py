@@ -0,0 +1,28 @@
+# models/su_sms_batch_tuning.py
+
+from odoo import fields, models
+
+
+class SuSmsBatchTuning(models.Model):
+    """
+    Learned Africa's Talking chunk size per company, with the recent
+    latency and error rate it was derived from. Maintained by
+    tools/at_batch_tuning.py on its own cursor after every bulk send.
+    """
+    _name = 'su.sms.batch.tuning'
+    _description = 'SU SMS Adaptive Batch Size'
+    _log_access = False
+
+    company_id = fields.Many2one(
+        'res.company', string='Company',
+        required=True, ondelete='cascade', index=True,
+    )
+    batch_size = fields.Integer('Recipients per Request', readonly=True)
+    latency = fields.Float('Avg. Request Latency (s)', readonly=True, digits=(10, 3))
+    error_rate = fields.Float('Recent Error Rate', readonly=True, digits=(10, 3))
+    updated_at = fields.Datetime('Last Update', readonly=True)
+
+    _company_unique = models.Constraint(
+        'unique(company_id)',
+        'Only one batch tuning record per company.',
+    )
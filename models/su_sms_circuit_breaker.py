@@ -0,0 +1,53 @@
+# models/su_sms_circuit_breaker.py
+
+from odoo import api, fields, models
+
+
+class SuSmsCircuitBreaker(models.Model):
+    """
+    State of the circuit breakers guarding outbound integrations
+    (Africa's Talking per company, juba data service). Rows are created and
+    updated by tools/circuit_breaker.py on its own cursor; the model exists
+    for the schema and for displaying the state on the dashboard.
+    """
+    _name = 'su.sms.circuit.breaker'
+    _description = 'SU SMS Integration Circuit Breaker'
+    _order = 'service, company_id'
+    _log_access = False
+
+    name = fields.Char('Key', required=True, readonly=True)
+    service = fields.Selection([
+        ('africas_talking', "Africa's Talking"),
+        ('juba', 'juba Data Service'),
+    ], string='Service', required=True, readonly=True)
+    company_id = fields.Many2one(
+        'res.company', string='Company', ondelete='cascade', readonly=True,
+    )
+    state = fields.Selection([
+        ('closed', 'Closed (healthy)'),
+        ('open', 'Open (failing fast)'),
+        ('half_open', 'Half-open (probing)'),
+    ], string='State', default='closed', required=True, readonly=True)
+    failure_count = fields.Integer('Consecutive Failures', readonly=True)
+    opened_at = fields.Datetime('Opened At', readonly=True)
+    last_failure_at = fields.Datetime('Last Failure', readonly=True)
+    last_error = fields.Char('Last Error', readonly=True)
+
+    _name_unique = models.Constraint(
+        'unique(name)',
+        'Only one circuit breaker per integration.',
+    )
+
+    @api.model
+    def get_dashboard_states(self):
+        """Breaker states for the dashboard, one dict per integration."""
+        service_labels = dict(self._fields['service'].selection)
+        state_labels = dict(self._fields['state'].selection)
+        return [{
+            'service':       service_labels.get(rec.service, rec.service),
+            'company':       rec.company_id.name or '',
+            'state':         rec.state,
+            'state_label':   state_labels.get(rec.state, rec.state),
+            'failure_count': rec.failure_count,
+            'last_error':    rec.last_error or '',
+        } for rec in self.sudo().search([])]
@@ -1,7 +1,32 @@
 # models/su_sms_detail.py
 
+import logging
+import random
+from datetime import timedelta
 
-from odoo import fields, models
+from odoo import api, fields, models
+from odoo.tools import split_every
+
+from odoo.addons.su_sms_integrated.tools.db_concurrency import PG_CONCURRENCY_ERRORS
+from odoo.addons.su_sms_integrated.tools.phone_check import check_phone_numbers, phone_e164
+from odoo.addons.su_sms_integrated.tools.recipient_dedupe import RecipientDeduper
+from odoo.addons.su_sms_integrated.tools.sms_at import AT_TRANSIENT_FAILURE_TYPES
+
+_logger = logging.getLogger(__name__)
+
+# Longest backoff between two retries of the same recipient (seconds)
+RETRY_MAX_DELAY = 6 * 3600
+
+# Rows per UPDATE statement when applying provider results
+RESULT_UPDATE_BATCH = 5000
+
+# Rows per INSERT statement for bulk recipient ingestion
+INGEST_BATCH = 10000
+
+# AT result states that mean the message was accepted
+RESULT_SENT_STATES = {'sent', 'pending', 'process'}
+
+RESULT_FIELDS = ['status', 'failure_reason', 'failure_type', 'at_message_id', 'cost', 'next_retry_at']
 
 
 class SuSmsDetail(models.Model):
@@ -32,7 +57,18 @@ class SuSmsDetail(models.Model):
     )
 
     recipient_name = fields.Char('Recipient Name')
+    # Names of the duplicate rows folded into this detail (recipient_count > 1)
+    merged_names = fields.Char('Merged Recipients', readonly=True, copy=False)
     phone_number = fields.Char('Phone Number', required=True)
+    # phone_number as entered, normalised once: lookups, dedupe and history
+    # match on this column instead of normalising every row on the fly.
+    # Filled in bulk on ingestion; empty for numbers that cannot be sent.
+    phone_e164 = fields.Char(
+        'Number (E.164)', compute='_compute_phone_e164', store=True,
+        index=True, readonly=True, copy=False,
+    )
+    # Operator the number is allocated to (tools/phone_check.py), set on ingestion
+    carrier = fields.Char('Carrier', readonly=True, index=True)
 
     # Africa's Talking response fields
     at_message_id = fields.Char('AT Message ID', readonly=True)
@@ -48,6 +84,258 @@ class SuSmsDetail(models.Model):
     ], default='draft', string='Status', index=True)
 
     failure_reason = fields.Char('Failure Reason', readonly=True)
+    failure_type = fields.Char('Failure Type', readonly=True, copy=False)
 
     # UUID links back to sms.sms for result matching
     sms_uuid = fields.Char('SMS UUID', index=True, copy=False)
+
+    # Retry bookkeeping - transient failures are re-sent by cron
+    attempt_count = fields.Integer('Send Attempts', readonly=True, copy=False)
+    last_attempt_at = fields.Datetime('Last Attempt', readonly=True, copy=False)
+    next_retry_at = fields.Datetime('Next Retry', readonly=True, copy=False, index=True)
+
+    # Campaign statistics and the send queue both look rows up by (campaign, status)
+    _message_status_idx = models.Index('(message_id, status)')
+
+    @api.depends('phone_number')
+    def _compute_phone_e164(self):
+        checks = check_phone_numbers(self.mapped('phone_number'))
+        for detail, check in zip(self, checks):
+            detail.phone_e164 = phone_e164(check)
+
+    # ------------------------------------------------------------------
+    # Retry scheduling
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_retry_settings(self):
+        """Return (max_attempts, base_delay_seconds) from system parameters."""
+        cfg = self.env['ir.config_parameter'].sudo()
+        try:
+            max_attempts = int(cfg.get_param('su_sms.retry_max_attempts', '3'))
+            base_delay = int(cfg.get_param('su_sms.retry_base_delay', '60'))
+        except (ValueError, TypeError):
+            max_attempts, base_delay = 3, 60
+        return max_attempts, max(base_delay, 1)
+
+    def _register_attempt(self):
+        """Count one send attempt for every detail in self (single UPDATE)."""
+        if not self:
+            return
+        self.flush_recordset(['attempt_count'])
+        self.env.cr.execute("""
+            UPDATE su_sms_detail
+               SET attempt_count = COALESCE(attempt_count, 0) + 1,
+                   last_attempt_at = NOW() AT TIME ZONE 'UTC',
+                   next_retry_at = NULL
+             WHERE id IN %s
+        """, [tuple(self.ids)])
+        self.invalidate_recordset(['attempt_count', 'last_attempt_at', 'next_retry_at'])
+
+    def _link_sms_uuids(self, uuids):
+        """Store ``uuids[i]`` as sms_uuid of the i-th detail of self (single UPDATE)."""
+        if not self:
+            return
+        self.flush_recordset(['sms_uuid'])
+        self.env.cr.execute("""
+            UPDATE su_sms_detail d
+               SET sms_uuid = v.sms_uuid
+              FROM unnest(%s::int[], %s::varchar[]) AS v(id, sms_uuid)
+             WHERE d.id = v.id
+        """, [self.ids, list(uuids)])
+        self.invalidate_recordset(['sms_uuid'])
+
+    def _get_next_retry_at(self, failure_type, settings=None):
+        """
+        Exponential backoff with jitter for a failed detail, or False when
+        the failure is permanent or the attempts are exhausted.
+        """
+        self.ensure_one()
+        max_attempts, base_delay = settings or self._get_retry_settings()
+        if failure_type not in AT_TRANSIENT_FAILURE_TYPES or self.attempt_count >= max_attempts:
+            return False
+        delay = min(base_delay * 2 ** max(self.attempt_count - 1, 0), RETRY_MAX_DELAY)
+        delay += random.uniform(0, delay / 2)
+        return fields.Datetime.now() + timedelta(seconds=delay)
+
+    # ------------------------------------------------------------------
+    # Bulk ingestion
+    # ------------------------------------------------------------------
+    @api.model
+    def _bulk_insert_recipients(self, message, recipients):
+        """
+        Insert pending recipients for ``message`` straight into the table.
+        ``recipients`` is any iterable of (name, phone_number) pairs and is
+        consumed lazily, INGEST_BATCH rows per multi-row INSERT, so callers
+        can stream large files without building vals dicts or records.
+        The stored related department_id and the E.164 form and carrier of
+        each number are filled in as well.
+
+        Only the first row of each normalised number is inserted
+        (tools/recipient_dedupe.py); repeats are folded into that detail's
+        recipient_count and merged_names with one UPDATE per
+        RESULT_UPDATE_BATCH merges at the end. Returns the number of rows
+        inserted.
+        """
+        message.ensure_one()
+        self.flush_model()
+        department_id = message.department_id.id or None
+        deduper = RecipientDeduper()
+        total = 0
+        for batch in split_every(INGEST_BATCH, deduper.iter_unique(recipients)):
+            self.env.cr.execute("""
+                INSERT INTO su_sms_detail (
+                    message_id, department_id, recipient_name, phone_number, phone_e164, carrier,
+                    status, recipient_count, attempt_count,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT %(message_id)s, %(department_id)s, v.name, v.phone_number, v.phone_e164, v.carrier,
+                       'pending', 1, 0,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM unnest(%(names)s::varchar[], %(numbers)s::varchar[],
+                              %(e164)s::varchar[], %(carriers)s::varchar[])
+                       AS v(name, phone_number, phone_e164, carrier)
+            """, {
+                'message_id': message.id,
+                'department_id': department_id,
+                'uid': self.env.uid,
+                'names': [r.name or None for r in batch],
+                'numbers': [r.number for r in batch],
+                'e164': [r.e164 for r in batch],
+                'carriers': [r.carrier or None for r in batch],
+            })
+            total += self.env.cr.rowcount
+
+        merges = deduper.merges()
+        for batch in split_every(RESULT_UPDATE_BATCH, merges):
+            keys, counts, first_names, names = zip(*batch)
+            self.env.cr.execute("""
+                UPDATE su_sms_detail d
+                   SET recipient_count = v.recipient_count,
+                       recipient_name = COALESCE(NULLIF(d.recipient_name, ''), v.name),
+                       merged_names = v.merged_names
+                  FROM unnest(%s::varchar[], %s::int[], %s::varchar[], %s::varchar[])
+                       AS v(key, recipient_count, name, merged_names)
+                 WHERE d.message_id = %s
+                   AND d.status = 'pending'
+                   AND COALESCE(d.phone_e164, d.phone_number) = v.key
+            """, [
+                list(keys), list(counts),
+                [n or None for n in first_names], [n or None for n in names],
+                message.id,
+            ])
+        if merges:
+            _logger.info(
+                "SU SMS: %d duplicate recipient rows collapsed into %d numbers for message=%s",
+                sum(m.count - 1 for m in merges), len(merges), message.id,
+            )
+        if total:
+            message.invalidate_recordset(['detail_ids'])
+            self.invalidate_model(['recipient_count', 'recipient_name', 'merged_names'])
+            message._refresh_send_stats()
+        return total
+
+    # ------------------------------------------------------------------
+    # Provider results
+    # ------------------------------------------------------------------
+    @api.model
+    def _apply_send_results(self, updates):
+        """
+        Write provider results onto details in bulk. ``updates`` is a list of
+        (detail, result) pairs where result is a _send_sms_batch result dict.
+        Each slice of RESULT_UPDATE_BATCH rows is applied with one
+        UPDATE ... FROM unnest(...) statement instead of a write() per row.
+        Returns the details that were sent.
+        """
+        if not updates:
+            return self.browse()
+        retry_settings = self._get_retry_settings()
+        rows = []
+        for detail, result in updates:
+            failure_type = result.get('failure_type') or None
+            if result.get('state') in RESULT_SENT_STATES:
+                status = 'sent'
+            else:
+                status = 'failed'
+                # Results without a failure type (e.g. {'state': 'server_error'}
+                # from sms.sms's exception path) are retried
+                failure_type = failure_type or 'sms_server'
+            rows.append((
+                detail.id,
+                status,
+                result.get('failure_reason') or (result.get('state') if status == 'failed' else None),
+                failure_type,
+                result.get('at_message_id') or None,
+                result.get('credit') or 0.0,
+                # Transient failures are picked up again by the retry cron
+                (detail._get_next_retry_at(failure_type, retry_settings) or None)
+                if status == 'failed' else None,
+            ))
+
+        details = self.browse(row[0] for row in rows)
+        details.flush_recordset(RESULT_FIELDS)
+        for batch in split_every(RESULT_UPDATE_BATCH, rows):
+            self.env.cr.execute("""
+                UPDATE su_sms_detail d
+                   SET status = v.status,
+                       failure_reason = v.failure_reason,
+                       failure_type = v.failure_type,
+                       at_message_id = v.at_message_id,
+                       cost = v.cost,
+                       next_retry_at = v.next_retry_at,
+                       write_uid = %s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                  FROM unnest(%s::int[], %s::varchar[], %s::varchar[], %s::varchar[],
+                              %s::varchar[], %s::numeric[], %s::timestamp[])
+                       AS v(id, status, failure_reason, failure_type, at_message_id, cost, next_retry_at)
+                 WHERE d.id = v.id
+            """, [self.env.uid, *map(list, zip(*batch))])
+        details.invalidate_recordset(RESULT_FIELDS + ['write_uid', 'write_date'])
+        # Campaign counters depend on status and cost
+        details.modified(RESULT_FIELDS)
+        return self.browse(row[0] for row in rows if row[1] == 'sent')
+
+    @api.model
+    def _cron_retry_failed_details(self, limit=5000):
+        """
+        Re-send failed details whose backoff has elapsed. Details are grouped
+        per campaign so each retry goes out as batched AT calls; the
+        transaction is committed after every campaign.
+        """
+        due = self.search([
+            ('status', '=', 'failed'),
+            ('next_retry_at', '!=', False),
+            ('next_retry_at', '<=', fields.Datetime.now()),
+        ], order='next_retry_at', limit=limit)
+        if not due:
+            return
+        _logger.info("SU SMS retry: %d recipients due for retry", len(due))
+        for message, details in due.grouped('message_id').items():
+            details = details._lock_for_send('failed')
+            if details:
+                message._send_details(details)
+                # Settle done / partial / failed again once retries went through
+                message._update_send_state()
+            if not self.env.registry.in_test_mode():
+                self.env.cr.commit()
+
+    def _lock_for_send(self, status):
+        """
+        Row-lock the details of self still in ``status``, skipping rows a
+        send-queue run holds, so no recipient is sent twice.
+        """
+        if not self:
+            return self
+        self.flush_recordset(['status'])
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("""
+                    SELECT id
+                      FROM su_sms_detail
+                     WHERE id IN %s
+                       AND status = %s
+                       FOR UPDATE SKIP LOCKED
+                """, [tuple(self.ids), status])
+                ids = {row[0] for row in self.env.cr.fetchall()}
+        except PG_CONCURRENCY_ERRORS:
+            return self.browse()
+        return self.filtered(lambda d: d.id in ids)
@@ -0,0 +1,257 @@
+# models/su_sms_directory.py
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import split_every
+from odoo.tools.sql import escape_psql
+
+from odoo.addons.su_sms_integrated.tools.webservice import SuSmsWebService, WebServiceStreamError
+
+_logger = logging.getLogger(__name__)
+
+# Rows per statement when loading a sync into the staging table
+DIRECTORY_SYNC_BATCH = 5000
+
+
+def _text_match(fname, value):
+    """Case-insensitive exact match on a free-text mirror column."""
+    return (fname, '=ilike', escape_psql(value))
+
+
+class SuSmsDirectoryMixin(models.AbstractModel):
+    """
+    Local mirror of a juba directory (staff or students), refreshed by the
+    "SU SMS: Sync Directory Mirror" cron. get_staff / get_students answer
+    from these tables with indexed SQL instead of calling juba, and keep
+    working from the last good sync while juba is slow or down.
+
+    A sync stages the full listing in a temporary table and applies it with
+    one upsert (only rows whose content changed are rewritten) and one
+    delete of rows juba no longer returns.
+    """
+    _name = 'su.sms.directory.mixin'
+    _description = 'SU SMS Directory Mirror'
+    _log_access = False
+
+    # juba listing -> row dict; set by each mirror
+    _directory_kind = None
+    # Mirrored columns besides ext_key / content_hash, in staging order
+    _directory_columns = ()
+
+    ext_key = fields.Char('juba Key', required=True, readonly=True)
+    name = fields.Char('Name', readonly=True)
+    phone = fields.Char('Phone', readonly=True)
+    content_hash = fields.Char(readonly=True)
+    synced_at = fields.Datetime('Last Changed', readonly=True)
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+    @api.model
+    def _freshness_param(self):
+        return f'su_sms.directory_{self._directory_kind}_synced_at'
+
+    @api.model
+    def _get_last_sync(self):
+        """Datetime of the last successful sync, or False."""
+        value = self.env['ir.config_parameter'].sudo().get_param(self._freshness_param())
+        return fields.Datetime.to_datetime(value) if value else False
+
+    @api.model
+    def _get_max_age(self):
+        try:
+            hours = float(self.env['ir.config_parameter'].sudo().get_param(
+                'su_sms.directory_max_age_hours', '26'))
+        except (ValueError, TypeError):
+            hours = 26.0
+        return timedelta(hours=max(hours, 0))
+
+    @api.model
+    def _is_fresh(self):
+        last_sync = self._get_last_sync()
+        return bool(last_sync) and fields.Datetime.now() - last_sync <= self._get_max_age()
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+    @api.model
+    def _directory_rows(self, records):
+        """Map juba JSON records to dicts of _directory_columns (+ ext_key)."""
+        raise NotImplementedError
+
+    @api.model
+    def _sync_from_records(self, records):
+        """
+        Apply a full juba listing (any iterable, e.g. a streamed response) to
+        the mirror. Returns (records, changed, removed). An empty listing is
+        refused so an outage never wipes the mirror.
+        """
+        rows = {}
+        for row in self._directory_rows(records):
+            rows[row['ext_key']] = row
+        if not rows:
+            raise ValueError(f"juba returned no {self._directory_kind} records")
+
+        table = self._table
+        columns = ('ext_key', 'content_hash') + tuple(self._directory_columns)
+        cr = self.env.cr
+        self.flush_model()
+        column_list = ', '.join(columns)
+        cr.execute(f"""
+            CREATE TEMPORARY TABLE {table}_sync
+                ({', '.join(f'{c} varchar' for c in columns)}) ON COMMIT DROP
+        """)
+        for batch in split_every(DIRECTORY_SYNC_BATCH, rows.values()):
+            values = [[] for _column in columns]
+            for row in batch:
+                row['content_hash'] = hashlib.sha1(
+                    json.dumps([row.get(c) for c in self._directory_columns]).encode('utf-8')
+                ).hexdigest()
+                for i, column in enumerate(columns):
+                    values[i].append(row.get(column) or None)
+            unnest_args = ', '.join(['%s::varchar[]'] * len(columns))
+            cr.execute(
+                f"INSERT INTO {table}_sync ({column_list}) SELECT * FROM unnest({unnest_args})",
+                values,
+            )
+
+        updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns[1:])
+        cr.execute(f"""
+            INSERT INTO {table} ({column_list}, synced_at)
+            SELECT {column_list}, NOW() AT TIME ZONE 'UTC' FROM {table}_sync
+            ON CONFLICT (ext_key) DO UPDATE
+               SET {updates}, synced_at = EXCLUDED.synced_at
+             WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        """)
+        changed = cr.rowcount
+        cr.execute(f"""
+            DELETE FROM {table} t
+             WHERE NOT EXISTS (SELECT 1 FROM {table}_sync s WHERE s.ext_key = t.ext_key)
+        """)
+        removed = cr.rowcount
+        cr.execute(f"DROP TABLE {table}_sync")
+        self.invalidate_model()
+
+        self.env['ir.config_parameter'].sudo().set_param(
+            self._freshness_param(), fields.Datetime.to_string(fields.Datetime.now()),
+        )
+        return len(rows), changed, removed
+
+    @api.model
+    def _cron_sync_directory(self):
+        """Cron entry point: mirror every directory; one failure does not stop the other."""
+        ws = SuSmsWebService(self.env)
+        for model_name in ('su.sms.directory.staff', 'su.sms.directory.student'):
+            directory = self.env[model_name].sudo()
+            records = ws.fetch_directory(directory._directory_kind)
+            if records is None:
+                _logger.warning("SU SMS directory: %s sync skipped, juba unavailable", directory._directory_kind)
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    count, changed, removed = directory._sync_from_records(records)
+            except (ValueError, WebServiceStreamError) as exc:
+                _logger.warning("SU SMS directory: %s sync aborted: %s", directory._directory_kind, exc)
+                continue
+            _logger.info(
+                "SU SMS directory: %s synced - %d records, %d changed, %d removed",
+                directory._directory_kind, count, changed, removed,
+            )
+            if not self.env.registry.in_test_mode():
+                self.env.cr.commit()
+
+
+class SuSmsDirectoryStaff(models.Model):
+    _name = 'su.sms.directory.staff'
+    _inherit = 'su.sms.directory.mixin'
+    _description = 'SU SMS Staff Directory Mirror'
+    _order = 'name'
+
+    _directory_kind = 'staff'
+    _directory_columns = (
+        'name', 'phone', 'department', 'department_code', 'gender', 'category', 'job_status',
+    )
+
+    department = fields.Char('Department', readonly=True, index=True)
+    # The short code administrators' departments are scoped by (e.g. 'ICTD'),
+    # when juba sends one next to the department name
+    department_code = fields.Char('Department Code', readonly=True, index=True)
+    gender = fields.Char('Gender', readonly=True, index=True)
+    category = fields.Char('Category', readonly=True, index=True)
+    job_status = fields.Char('Job Status Type', readonly=True, index=True)
+
+    _ext_key_unique = models.Constraint('unique(ext_key)', 'Duplicate juba staff key.')
+
+    @api.model
+    def _directory_rows(self, records):
+        return SuSmsWebService.staff_directory_rows(records)
+
+    @api.model
+    def _find_recipients(self, department=None, gender=None, category=None, job_status=None):
+        """(name, phone) pairs matching the get_staff filters."""
+        domain = [('phone', '!=', False)]
+        if department:
+            # A department short code, or a name when juba sends no code
+            domain += ['|', _text_match('department_code', department), _text_match('department', department)]
+        if gender and gender != 'all':
+            domain.append(_text_match('gender', gender))
+        if category:
+            domain.append(_text_match('category', category))
+        if job_status:
+            domain.append(_text_match('job_status', job_status))
+        rows = self.search_fetch(domain, ['name', 'phone'])
+        return [(row.name or 'Staff', row.phone) for row in rows]
+
+
+class SuSmsDirectoryStudent(models.Model):
+    _name = 'su.sms.directory.student'
+    _inherit = 'su.sms.directory.mixin'
+    _description = 'SU SMS Student Directory Mirror'
+    _order = 'name'
+
+    _directory_kind = 'student'
+    _directory_columns = (
+        'name', 'phone', 'father_phone', 'mother_phone',
+        'school', 'program', 'course', 'intake', 'academic_year', 'student_year',
+    )
+
+    father_phone = fields.Char('Father Phone', readonly=True)
+    mother_phone = fields.Char('Mother Phone', readonly=True)
+    school = fields.Char('School', readonly=True, index=True)
+    program = fields.Char('Program', readonly=True, index=True)
+    course = fields.Char('Course', readonly=True, index=True)
+    intake = fields.Char('Intake', readonly=True, index=True)
+    academic_year = fields.Char('Academic Year', readonly=True, index=True)
+    student_year = fields.Char('Year of Study', readonly=True, index=True)
+
+    _ext_key_unique = models.Constraint('unique(ext_key)', 'Duplicate juba student key.')
+
+    @api.model
+    def _directory_rows(self, records):
+        return SuSmsWebService.student_directory_rows(records)
+
+    @api.model
+    def _find_recipients(self, school=None, program=None, course=None, academic_year=None,
+                         student_year=None, intake=None,
+                         include_students=True, include_fathers=False, include_mothers=False):
+        """(name, phone) pairs matching the get_students filters (academic listing)."""
+        domain = []
+        for fname, value in (('school', school), ('program', program), ('course', course),
+                             ('academic_year', academic_year), ('student_year', student_year),
+                             ('intake', intake)):
+            if value:
+                domain.append(_text_match(fname, value))
+        results = []
+        for row in self.search_fetch(domain, ['name', 'phone', 'father_phone', 'mother_phone']):
+            student_name = row.name or 'Student'
+            if include_students and row.phone:
+                results.append((student_name, row.phone))
+            if include_fathers and row.father_phone:
+                results.append((f"Father of {student_name}", row.father_phone))
+            if include_mothers and row.mother_phone:
+                results.append((f"Mother of {student_name}", row.mother_phone))
+        return results
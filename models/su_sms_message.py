@@ -1,15 +1,28 @@
 # models/su_sms_message.py
 
-import base64
-import csv
-import io
+import itertools
 import logging
+import time
+from collections import defaultdict
+from uuid import uuid4
 
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError
 
+from odoo.addons.su_sms_integrated.tools.csv_stream import (
+    has_binary_value,
+    iter_csv_recipients,
+    open_binary_stream,
+)
+from odoo.addons.su_sms_integrated.tools.db_concurrency import PG_CONCURRENCY_ERRORS
+from odoo.addons.su_sms_integrated.tools.phone_check import check_phone_numbers
+from odoo.addons.su_sms_integrated.tools.sms_template import compile_template, get_template_name_fallback
+
 _logger = logging.getLogger(__name__)
 
+# Per-campaign counters; not recomputed while a chunk is sent (see _send_details)
+SEND_STATS_FIELDS = ('recipient_count', 'success_count', 'failed_count', 'pending_count', 'total_cost')
+
 
 class SuSmsMessage(models.Model):
     _name = 'su.sms.message'
@@ -20,7 +33,10 @@ class SuSmsMessage(models.Model):
     # ------------------------------------------------------------------
     # Core fields
     # ------------------------------------------------------------------
-    body = fields.Text(string='Message', required=True)
+    body = fields.Text(
+        string='Message', required=True,
+        help="Sent to every recipient. {name} and {phone} are replaced per recipient.",
+    )
     sms_type = fields.Selection([
         ('adhoc', 'Ad Hoc (CSV Upload)'),
         ('student', 'Student SMS'),
@@ -59,6 +75,15 @@ class SuSmsMessage(models.Model):
         'message_id',
         string='Recipients',
     )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        readonly=True,
+        copy=False,
+        index=True,
+        help="Company of the sender when the campaign was queued; its "
+             "Africa's Talking account sends the campaign.",
+    )
 
     # ------------------------------------------------------------------
     # Computed
@@ -67,6 +92,7 @@ class SuSmsMessage(models.Model):
     recipient_count = fields.Integer(compute='_compute_stats', store=True)
     success_count = fields.Integer(compute='_compute_stats', store=True)
     failed_count = fields.Integer(compute='_compute_stats', store=True)
+    pending_count = fields.Integer(compute='_compute_stats', store=True)
     total_cost = fields.Float(
         compute='_compute_stats', store=True, digits=(10, 4),
         string='Total Cost (KES)',
@@ -131,97 +157,342 @@ class SuSmsMessage(models.Model):
 
     @api.depends('detail_ids.status', 'detail_ids.cost')
     def _compute_stats(self):
+        # One grouped SQL aggregate (served by the message_id/status index)
+        # instead of loading every recipient: a status change on a few rows
+        # of a large campaign no longer reads the whole campaign into memory
+        stats = defaultdict(lambda: defaultdict(lambda: (0, 0.0)))
+        saved = self.filtered('id')
+        if saved:
+            groups = self.env['su.sms.detail']._read_group(
+                [('message_id', 'in', saved.ids)],
+                groupby=['message_id', 'status'],
+                aggregates=['__count', 'cost:sum'],
+            )
+            for message, status, count, cost_sum in groups:
+                stats[message.id][status] = (count, cost_sum)
         for rec in self:
-            details = rec.detail_ids
-            rec.recipient_count = len(details)
-            rec.success_count = len(details.filtered(lambda d: d.status == 'sent'))
-            rec.failed_count = len(details.filtered(lambda d: d.status == 'failed'))
-            rec.total_cost = sum(details.filtered(lambda d: d.status == 'sent').mapped('cost'))
+            if rec.id:
+                by_status = stats[rec.id]
+            else:
+                # Unsaved campaign (onchange) - details only exist in cache
+                by_status = defaultdict(lambda: (0, 0.0))
+                for status, details in rec.detail_ids.grouped('status').items():
+                    by_status[status] = (len(details), sum(details.mapped('cost')))
+            rec.recipient_count = sum(count for count, _cost in by_status.values())
+            rec.success_count = by_status['sent'][0]
+            rec.failed_count = by_status['failed'][0]
+            rec.pending_count = by_status['pending'][0]
+            rec.total_cost = by_status['sent'][1]
 
     # ------------------------------------------------------------------
     # Business logic
     # ------------------------------------------------------------------
     def action_send(self):
-        """Build sms.sms records from detail_ids and trigger send."""
+        """
+        Queue the campaign for background sending. Unsent recipients are
+        (re)set to pending and the send-queue cron is triggered; it sends
+        them in bounded chunks (see _cron_process_send_queue).
+        """
         self.ensure_one()
         if self.state not in ('draft', 'failed'):
             raise UserError(_('Only draft or failed messages can be sent.'))
-        if not self.detail_ids:
+        Detail = self.env['su.sms.detail']
+        if not Detail.search_count([('message_id', '=', self.id)], limit=1):
             raise UserError(_('No recipients. Please add recipients before sending.'))
-
-        self.write({'state': 'sending'})
-
-        # Build sms.sms outgoing records linked to this campaign
-        sms_vals = []
-        for detail in self.detail_ids.filtered(lambda d: d.status in ('pending', 'failed', 'draft')):
-            if not detail.phone_number:
-                continue
-            sms_vals.append({
-                'number': detail.phone_number,
-                'body': self.body,
-                'su_message_id': self.id,
-                'record_company_id': self.env.company.id,
-            })
-
-        if not sms_vals:
+        if not Detail.search_count([
+            ('message_id', '=', self.id),
+            ('status', 'in', ('pending', 'failed', 'draft')),
+            ('phone_number', 'not in', (False, '')),
+        ], limit=1):
             self.write({'state': 'failed'})
             raise UserError(_('No valid phone numbers found.'))
 
-        sms_records = self.env['sms.sms'].create(sms_vals)
+        self._reset_unsent_details()
+        # The queue and retry crons run as the superuser: remember whose
+        # Africa's Talking account this campaign goes out on
+        self.write({'state': 'queued', 'company_id': self.env.company.id})
+        self._trigger_send_queue()
+        return True
 
-        # Update detail with uuid for result tracking
-        sms_by_number = {s.number: s for s in sms_records}
-        for detail in self.detail_ids:
-            sms = sms_by_number.get(detail.phone_number)
-            if sms:
-                detail.sms_uuid = sms.uuid
+    # ------------------------------------------------------------------
+    # Recipient maintenance - one statement each, campaigns may hold
+    # hundreds of thousands of details that must not be loaded
+    # ------------------------------------------------------------------
+    def _reset_unsent_details(self):
+        """Put the failed and draft recipients with a number back to pending."""
+        self.ensure_one()
+        Detail = self.env['su.sms.detail']
+        Detail.flush_model(['message_id', 'status', 'phone_number', 'next_retry_at'])
+        self.env.cr.execute("""
+            UPDATE su_sms_detail
+               SET status = 'pending',
+                   next_retry_at = NULL,
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+             WHERE message_id = %s
+               AND status IN ('failed', 'draft')
+               AND COALESCE(phone_number, '') != ''
+        """, [self.env.uid, self.id])
+        Detail.invalidate_model(['status', 'next_retry_at', 'write_uid', 'write_date'])
+        self._recompute_send_stats()
+
+    def _delete_pending_details(self):
+        """Drop the pending recipients before a repopulation; sent/failed stay."""
+        self.ensure_one()
+        Detail = self.env['su.sms.detail']
+        Detail.flush_model(['message_id', 'status'])
+        self.env.cr.execute("""
+            DELETE FROM su_sms_detail
+             WHERE message_id = %s
+               AND status = 'pending'
+        """, [self.id])
+        Detail.invalidate_model()
+        self.invalidate_recordset(['detail_ids'])
+        self._recompute_send_stats()
+
+    def _recompute_send_stats(self):
+        for fname in SEND_STATS_FIELDS:
+            self.env.add_to_compute(self._fields[fname], self)
 
-        # Trigger send
-        sms_records.send(unlink_failed=False, unlink_sent=True, raise_exception=False)
-        self.write({'state': 'done'})
+    # ------------------------------------------------------------------
+    # Background send queue
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_queue_chunk_size(self):
+        try:
+            size = int(self.env['ir.config_parameter'].sudo().get_param(
+                'su_sms.queue_chunk_size', '2000'))
+        except (ValueError, TypeError):
+            size = 2000
+        return max(size, 1)
+
+    @api.model
+    def _trigger_send_queue(self):
+        """Run the send-queue cron as soon as a cron thread is free."""
+        cron = self.env.ref('su_sms_integrated.ir_cron_su_sms_send_queue', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_process_send_queue(self, time_budget=240):
+        """
+        Drain queued campaigns, oldest first, one chunk of pending recipients
+        at a time with a commit after each chunk - a crash or worker timeout
+        loses at most the chunk in flight, and the next run resumes from the
+        remaining pending recipients (campaigns stuck in 'sending' included).
+
+        The retry cron may send recipients of the same campaigns meanwhile:
+        each chunk is claimed with FOR UPDATE SKIP LOCKED, so the two never
+        send the same recipient twice. Re-triggers itself when the time
+        budget runs out with work left; parallelism within a chunk comes from
+        the AT dispatch (thread pool or async engine).
+        """
+        deadline = time.monotonic() + time_budget
+        chunk_size = self._get_queue_chunk_size()
+        messages = self.search([('state', 'in', ('queued', 'sending'))], order='create_date, id')
+        for message in messages:
+            message._mark_sending()
+            while time.monotonic() < deadline and message._send_next_chunk(chunk_size):
+                self._commit_progress()
+                message._refresh_send_stats()
+                self._commit_progress()
+            if time.monotonic() >= deadline:
+                self._trigger_send_queue()
+                break
+
+    @api.model
+    def _commit_progress(self):
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    def _try_concurrent(self, func):
+        """
+        Run ``func`` in a savepoint; return False instead of raising when a
+        concurrent send job got there first.
+        """
+        try:
+            with self.env.cr.savepoint():
+                func()
+        except PG_CONCURRENCY_ERRORS:
+            self.env.invalidate_all()
+            return False
         return True
 
-    def action_populate_from_csv(self):
-        """Parse CSV and populate detail_ids."""
+    def _mark_sending(self):
+        """queued -> sending, tolerating the retry cron doing the same."""
         self.ensure_one()
-        if not self.csv_file:
-            raise UserError(_('Please upload a CSV file first.'))
+        if self.state != 'queued':
+            return
+        self._try_concurrent(lambda: self.write({'state': 'sending'}))
+        self._commit_progress()
+
+    def _claim_pending_details(self, limit):
+        """
+        Lock up to ``limit`` pending recipients of this campaign that no other
+        send job holds. The row locks last until the caller commits, by which
+        time the claimed recipients are no longer pending. Returns None when
+        a recipient changed since this transaction's snapshot was taken.
+        """
+        self.ensure_one()
+        self.env['su.sms.detail'].flush_model(['message_id', 'status'])
         try:
-            data = base64.b64decode(self.csv_file)
-            reader = csv.DictReader(io.StringIO(data.decode('utf-8', errors='replace')))
-        except Exception as exc:
-            raise UserError(_('Could not parse CSV: %s', str(exc)))
-
-        # Detect number column
-        number_keys = ['Phone Number', 'phone_number', 'Phone', 'phone', 'Number', 'number']
-        name_keys = ['Name', 'name', 'Full Name', 'full_name']
-
-        vals_list = []
-        for row in reader:
-            phone = None
-            for k in number_keys:
-                if k in row and row[k]:
-                    phone = row[k].strip()
-                    break
-            name = ''
-            for k in name_keys:
-                if k in row and row[k]:
-                    name = row[k].strip()
-                    break
-            if phone:
-                vals_list.append({
-                    'message_id': self.id,
-                    'recipient_name': name,
-                    'phone_number': phone,
-                    'status': 'pending',
+            with self.env.cr.savepoint():
+                self.env.cr.execute("""
+                    SELECT id
+                      FROM su_sms_detail
+                     WHERE message_id = %s
+                       AND status = 'pending'
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                """, [self.id, limit])
+                ids = [row[0] for row in self.env.cr.fetchall()]
+        except PG_CONCURRENCY_ERRORS:
+            return None
+        return self.env['su.sms.detail'].browse(ids)
+
+    def _send_next_chunk(self, chunk_size):
+        """
+        Claim and send up to ``chunk_size`` pending recipients of this
+        campaign. Returns False (after settling the campaign state) when no
+        claimable recipient is left.
+        """
+        self.ensure_one()
+        details = self._claim_pending_details(chunk_size)
+        if details is None:
+            # Raced with another send job; the next run picks this campaign up again
+            return False
+        if not details:
+            self._update_send_state()
+            return False
+
+        self._send_details(details)
+
+        # Recipients without a provider result would be picked up forever
+        unresolved = details.filtered(lambda d: d.status == 'pending')
+        if unresolved:
+            with self._hold_send_stats():
+                unresolved.write({
+                    'status': 'failed',
+                    'failure_reason': _('No result received from the SMS provider'),
                 })
+        return True
+
+    def _hold_send_stats(self):
+        """Context manager: keep detail writes from recomputing the campaign counters."""
+        return self.env.protecting([self._fields[fname] for fname in SEND_STATS_FIELDS], self)
+
+    def _refresh_send_stats(self):
+        """Recompute the campaign counters held back during sending."""
+        def refresh():
+            self._recompute_send_stats()
+            self.flush_recordset()
+        return self._try_concurrent(refresh)
+
+    def _update_send_state(self):
+        """Settle the final campaign state once no recipient is pending."""
+        if not self._refresh_send_stats():
+            return
+        for rec in self:
+            if rec.pending_count:
+                continue
+            if not rec.failed_count:
+                state = 'done'
+            elif rec.success_count:
+                state = 'partial'
+            else:
+                state = 'failed'
+            rec._try_concurrent(lambda rec=rec, state=state: rec.write({'state': state}))
+
+    def _send_details(self, details):
+        """
+        Build sms.sms outgoing records for ``details`` of this campaign, link
+        them back through sms_uuid and send them as one batch.
+        Used by the send queue and by the retry cron.
+
+        The campaign counters are not recomputed here: concurrent workers
+        sending the same campaign would otherwise all update its row and
+        fail on serialization errors after the SMS went out. Callers refresh
+        them afterwards with _refresh_send_stats().
+        """
+        self.ensure_one()
+        details = details.filtered('phone_number')
+        details = self._reject_invalid_numbers(details)
+        if not details:
+            return self.env['sms.sms']
+        # Sent with the account of the company the campaign was queued from,
+        # not the cron user's
+        company = self.company_id or self.env.company
+
+        # Personalised bodies ({name}, tools/sms_template.py): sms.sms are
+        # created ordered by rendered text so identical renders share AT
+        # bulk requests (sms.sms batches are grouped by body). {name} is the
+        # detail's single recipient_name, never its merged_names.
+        template = compile_template(self.body, get_template_name_fallback(self.env))
+        if template.is_static:
+            bodies = [self.body] * len(details)
+        else:
+            rendered = sorted(
+                (template.render(detail.recipient_name, detail.phone_e164 or detail.phone_number), detail.id)
+                for detail in details
+            )
+            details = details.browse(detail_id for _body, detail_id in rendered)
+            bodies = [body for body, _detail_id in rendered]
+
+        # UUIDs are assigned per detail up front, so repeated numbers still
+        # map one detail to exactly one sms.sms
+        uuids = [uuid4().hex for _detail in details]
+        sms_records = self.env['sms.sms'].with_company(company).create([{
+            'uuid': sms_uuid,
+            'number': detail.phone_number,
+            'body': body,
+            'su_message_id': self.id,
+            'record_company_id': company.id,
+        } for detail, sms_uuid, body in zip(details, uuids, bodies)])
+
+        details._link_sms_uuids(uuids)
+        details._register_attempt()
+
+        # Trigger send
+        with self._hold_send_stats():
+            sms_records.send(unlink_failed=False, unlink_sent=True, raise_exception=False)
+        return sms_records
+
+    def _reject_invalid_numbers(self, details):
+        """
+        Fail the details whose number cannot be delivered (tools/phone_check.py)
+        without creating sms.sms for them; returns the remaining details.
+        """
+        checks = check_phone_numbers(details.mapped('phone_number'))
+        rejected = [
+            (detail, {
+                'state': 'sms_number_format',
+                'failure_type': 'sms_number_format',
+                'failure_reason': check.reason,
+            })
+            for detail, check in zip(details, checks) if check.verdict == 'invalid'
+        ]
+        if not rejected:
+            return details
+        with self._hold_send_stats():
+            self.env['su.sms.detail']._apply_send_results(rejected)
+        _logger.info("SU SMS: %d invalid numbers rejected before sending message=%s", len(rejected), self.id)
+        return details - details.browse(detail.id for detail, _result in rejected)
 
-        if not vals_list:
+    def action_populate_from_csv(self):
+        """Stream the CSV into detail_ids (normalised, de-duplicated, chunked inserts)."""
+        self.ensure_one()
+        if not has_binary_value(self, 'csv_file'):
+            raise UserError(_('Please upload a CSV file first.'))
+        # Repeated rows are merged (names, row count) by _bulk_insert_recipients
+        pairs = iter_csv_recipients(open_binary_stream(self, 'csv_file'), dedupe=False)
+        first = next(pairs, None)
+        if first is None:
             raise UserError(_('No valid phone numbers found in CSV. Expected columns: Name, Phone Number'))
 
         # Remove old pending details, keep sent/failed
-        self.detail_ids.filtered(lambda d: d.status == 'pending').unlink()
-        self.env['su.sms.detail'].create(vals_list)
+        self._delete_pending_details()
+        self.env['su.sms.detail']._bulk_insert_recipients(self, itertools.chain([first], pairs))
         return True
 
     def action_populate_from_manual(self):
@@ -232,20 +503,16 @@ class SuSmsMessage(models.Model):
         numbers = [n.strip() for n in self.manual_numbers.replace('\n', ',').split(',') if n.strip()]
         if not numbers:
             raise UserError(_('No valid numbers found.'))
-        self.detail_ids.filtered(lambda d: d.status == 'pending').unlink()
-        vals_list = [
-            {'message_id': self.id, 'phone_number': n, 'status': 'pending'}
-            for n in numbers
-        ]
-        self.env['su.sms.detail'].create(vals_list)
+        self._delete_pending_details()
+        self.env['su.sms.detail']._bulk_insert_recipients(self, (('', n) for n in numbers))
         return True
 
-    def _update_department_expenditure(self, detail):
-        """Called from sms_sms._handle_call_result_hook on success."""
-        # This is intentionally lightweight - detail already has cost from AT response
+    def _update_department_expenditure(self, details):
+        """Called from sms_sms._handle_call_result_hook with the sent details of a batch."""
+        # This is intentionally lightweight - details already have cost from AT response
         _logger.info(
-            'SU SMS expenditure: dept=%s cost=%s for message=%s',
-            self.department_id.name, detail.cost, self.id,
+            'SU SMS expenditure: dept=%s cost=%s (%d recipients) for message=%s',
+            self.department_id.name, sum(details.mapped('cost')), len(details), self.id,
         )
 
     def action_mark_kfs5(self):
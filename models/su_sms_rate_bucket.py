@@ -0,0 +1,28 @@
+# models/su_sms_rate_bucket.py
+
+from odoo import fields, models
+
+
+class SuSmsRateBucket(models.Model):
+    """
+    Token-bucket state for outbound Africa's Talking traffic, one row per
+    company. Read and written with SELECT ... FOR UPDATE by
+    tools/at_rate_limit.py so the limit holds across all Odoo workers and
+    cron threads - never edited through the ORM.
+    """
+    _name = 'su.sms.rate.bucket'
+    _description = 'SU SMS Outbound Rate Limit State'
+    _log_access = False
+
+    company_id = fields.Many2one(
+        'res.company', string='Company',
+        required=True, ondelete='cascade', index=True,
+    )
+    msg_tokens = fields.Float('Message Tokens')
+    req_tokens = fields.Float('Request Tokens')
+    refilled_at = fields.Datetime('Last Refill')
+
+    _company_unique = models.Constraint(
+        'unique(company_id)',
+        'Only one rate limit bucket per company.',
+    )
@@ -0,0 +1,60 @@
+# models/su_sms_ws_cache.py
+
+from odoo import api, fields, models
+
+
+class SuSmsWsCache(models.Model):
+    """
+    Cached juba data service responses, keyed by endpoint + filters.
+    Rows are written by tools/ws_cache.py on its own cursor so every worker
+    shares them; the model exists for the schema, the hit/miss metrics and
+    explicit invalidation from the Administration menu.
+    """
+    _name = 'su.sms.ws.cache'
+    _description = 'SU SMS Data Service Response Cache'
+    _order = 'fetched_at desc'
+    _log_access = False
+
+    key = fields.Char('Key', required=True, readonly=True)
+    endpoint = fields.Char('Endpoint', required=True, readonly=True)
+    params = fields.Char('Filters', readonly=True)
+    payload = fields.Text('Response (JSON)', readonly=True, prefetch=False)
+    record_count = fields.Integer('Records', readonly=True)
+    size_bytes = fields.Integer('Size (bytes)', readonly=True)
+    fetched_at = fields.Datetime('Fetched At', readonly=True)
+    expires_at = fields.Datetime('Expires At', readonly=True, index=True)
+    hit_count = fields.Integer('Hits', readonly=True)
+    miss_count = fields.Integer('Misses', readonly=True)
+    last_hit_at = fields.Datetime('Last Hit', readonly=True)
+
+    _key_unique = models.Constraint(
+        'unique(key)',
+        'Only one cache entry per endpoint and filter set.',
+    )
+
+    @api.model
+    def get_cache_metrics(self):
+        """Hit/miss totals over the cached entries, for the dashboard."""
+        self.env.cr.execute("""
+            SELECT COUNT(*), COALESCE(SUM(hit_count), 0), COALESCE(SUM(miss_count), 0),
+                   COALESCE(SUM(size_bytes), 0)
+              FROM su_sms_ws_cache
+        """)
+        entries, hits, misses, size = self.env.cr.fetchone()
+        lookups = hits + misses
+        return {
+            'entries':   entries,
+            'hits':      hits,
+            'misses':    misses,
+            'hit_ratio': round(100.0 * hits / lookups, 1) if lookups else 0.0,
+            'size_kb':   round(size / 1024.0, 1),
+        }
+
+    def action_invalidate(self):
+        """Drop the selected entries; the next send refetches them."""
+        self.sudo().unlink()
+
+    @api.model
+    def action_invalidate_all(self):
+        self.sudo().search([]).unlink()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
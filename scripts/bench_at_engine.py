@@ -0,0 +1,109 @@
+# scripts/bench_at_engine.py
+
+"""
+Benchmark of the Africa's Talking send engines against a local stand-in.
+
+A local HTTP server answers like AT's bulk messaging endpoint (every
+recipient 'Success') after a fixed latency, and the same campaign is sent
+through SmsApiAT._dispatch_at_chunks with:
+
+  sequential   one request after the other (concurrency 1, the old loop)
+  threads      the bounded thread pool (concurrency BENCH_CONCURRENCY)
+  async        the asyncio engine (window BENCH_WINDOW), when aiohttp is
+               installed
+
+Nothing is sent to Africa's Talking and nothing is written to the campaign
+tables; only the circuit breaker row of the current company is touched.
+No rate limit is applied. Run it in an Odoo shell of a database with the
+module installed:
+
+    odoo-bin shell -d DB --no-http < scripts/bench_at_engine.py
+
+Settings (environment variables): BENCH_RECIPIENTS (default 50000),
+BENCH_CHUNK (recipients per request, 500), BENCH_LATENCY (seconds per
+request at the stand-in, 0.2), BENCH_CONCURRENCY (8), BENCH_WINDOW (32).
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from odoo.addons.su_sms_integrated.tools.at_async import is_async_engine_available
+from odoo.addons.su_sms_integrated.tools.sms_api import SmsApiAT
+
+RECIPIENTS = int(os.environ.get('BENCH_RECIPIENTS', 50000))
+CHUNK = int(os.environ.get('BENCH_CHUNK', 500))
+LATENCY = float(os.environ.get('BENCH_LATENCY', 0.2))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 8))
+WINDOW = int(os.environ.get('BENCH_WINDOW', 32))
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like AT
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+        numbers = form.get('to', [''])[0].split(',')
+        time.sleep(LATENCY)
+        body = json.dumps({'SMSMessageData': {
+            'Message': f'Sent to {len(numbers)}/{len(numbers)}',
+            'Recipients': [{
+                'number': number, 'status': 'Success', 'statusCode': 101,
+                'cost': 'KES 0.8000', 'messageId': f'ATXid_{number}',
+            } for number in numbers],
+        }}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(env):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    api = SmsApiAT(env)
+    base = dict(
+        api._get_at_credentials(env.company),
+        endpoint=f'http://127.0.0.1:{server.server_port}/version1/messaging',
+        transport='native',
+        rate_messages=0,
+        rate_requests=0,
+    )
+    numbers = [f'+2547{i:08d}' for i in range(RECIPIENTS)]
+    requests_list = [
+        (numbers[i:i + CHUNK], 'Benchmark message')
+        for i in range(0, len(numbers), CHUNK)
+    ]
+    engines = [
+        ('sequential', dict(engine='threads', concurrency=1)),
+        ('threads', dict(engine='threads', concurrency=CONCURRENCY)),
+    ]
+    if is_async_engine_available():
+        engines.append(('async', dict(engine='async', async_window=WINDOW)))
+
+    print(f"{RECIPIENTS} recipients, {len(requests_list)} requests of {CHUNK}, "
+          f"{LATENCY * 1000:.0f} ms stand-in latency")
+    try:
+        for label, settings in engines:
+            credentials = dict(base, **settings)
+            start = time.perf_counter()
+            responses = api._dispatch_at_chunks(credentials, requests_list)
+            elapsed = time.perf_counter() - start
+            failed = sum(1 for response in responses if response is None)
+            print(f"  {label:<11} {elapsed:8.2f} s   {RECIPIENTS / elapsed:10.0f} recipients/s"
+                  f"   {failed} failed requests")
+    finally:
+        server.shutdown()
+
+
+run(env)  # noqa: F821 - provided by odoo-bin shell
@@ -0,0 +1,82 @@
+# scripts/bench_ingest.py
+
+"""
+Benchmark of campaign recipient ingestion: ORM create() versus
+su.sms.detail._bulk_insert_recipients, at 10k / 100k / 500k rows.
+
+  orm create   one vals dict per recipient and a single create() on the
+               list, flushed - what action_send / action_populate_from_csv
+               did before the bulk path
+  bulk insert  _bulk_insert_recipients streaming (name, number) pairs
+
+Every run happens in a savepoint that is rolled back, so the database is
+left as it was. Run it in an Odoo shell of a database with the module
+installed:
+
+    odoo-bin shell -d DB --no-http < scripts/bench_ingest.py
+
+BENCH_SIZES (comma-separated, default 10000,100000,500000) picks the sizes.
+"""
+
+import os
+import time
+
+SIZES = [int(size) for size in os.environ.get('BENCH_SIZES', '10000,100000,500000').split(',')]
+
+
+def make_campaign(env):
+    administrator = env['su.sms.administrator'].search([('user_id', '=', env.uid)], limit=1)
+    if not administrator:
+        department = env['su.sms.department'].create({'name': 'Benchmark', 'short_name': 'BENCH'})
+        administrator = env['su.sms.administrator'].create({
+            'user_id': env.uid,
+            'department_id': department.id,
+        })
+    return env['su.sms.message'].create({
+        'body': 'Benchmark message',
+        'sms_type': 'manual',
+        'administrator_id': administrator.id,
+    })
+
+
+def recipients(size):
+    return ((f'Recipient {i}', f'07{i:08d}') for i in range(size))
+
+
+def orm_create(env, message, size):
+    env['su.sms.detail'].create([{
+        'message_id': message.id,
+        'recipient_name': name,
+        'phone_number': number,
+        'status': 'pending',
+    } for name, number in recipients(size)])
+    env.flush_all()
+
+
+def bulk_insert(env, message, size):
+    env['su.sms.detail']._bulk_insert_recipients(message, recipients(size))
+    env.flush_all()
+
+
+def timed(env, func, size):
+    with env.cr.savepoint(flush=False) as savepoint:
+        message = make_campaign(env)
+        env.flush_all()
+        start = time.perf_counter()
+        func(env, message, size)
+        elapsed = time.perf_counter() - start
+        savepoint.rollback()
+    env.invalidate_all()
+    return elapsed
+
+
+def run(env):
+    env = env(su=True)
+    print(f"{'rows':>8}  {'orm create':>12}  {'bulk insert':>12}  speed-up")
+    for size in SIZES:
+        orm = timed(env, orm_create, size)
+        bulk = timed(env, bulk_insert, size)
+        print(f"{size:>8}  {orm:>10.2f} s  {bulk:>10.2f} s  {orm / bulk:7.1f}x")
+
+
+run(env)  # noqa: F821 - provided by odoo-bin shell
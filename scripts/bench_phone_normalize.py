@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# scripts/bench_phone_normalize.py
+
+"""
+Benchmark of phone number normalisation and pre-send validation.
+
+Compares, on N numbers (default 1M) drawn from a pool of distinct numbers
+so that repeats look like real campaigns (siblings share parents):
+
+  per-call re.sub        the original normalize_phone_number, uncached
+  per-call memoised      normalize_phone_number, one call per number
+  batch                  normalize_phone_numbers over the whole list
+  check per-call         check_phone_number, one call per number
+  check batch            check_phone_numbers over the whole list
+
+Needs neither Odoo nor a database: tools/sms_at.py and tools/phone_check.py
+are loaded on their own, without the addon package.
+
+    python3 scripts/bench_phone_normalize.py [--numbers 1000000] [--distinct 200000]
+"""
+
+import argparse
+import importlib
+import os
+import random
+import re
+import sys
+import time
+import types
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools')
+
+
+def load_tools():
+    package = types.ModuleType('su_sms_bench_tools')
+    package.__path__ = [TOOLS_DIR]
+    sys.modules[package.__name__] = package
+    return (
+        importlib.import_module('su_sms_bench_tools.sms_at'),
+        importlib.import_module('su_sms_bench_tools.phone_check'),
+    )
+
+
+def normalize_uncached(number, default_country_code='254'):
+    """normalize_phone_number as it was before memoisation."""
+    if not number:
+        return None
+    cleaned = re.sub(r'[^\d+]', '', number.strip())
+    if cleaned.startswith('+'):
+        return cleaned
+    if cleaned.startswith('0') and len(cleaned) == 10:
+        return f'+{default_country_code}{cleaned[1:]}'
+    if cleaned.startswith(default_country_code):
+        return f'+{cleaned}'
+    return f'+{cleaned}'
+
+
+def make_numbers(count, distinct, seed=42):
+    rnd = random.Random(seed)
+    formats = (
+        lambda n: f'07{n}',
+        lambda n: f'+2547{n}',
+        lambda n: f'2547{n}',
+        lambda n: f'07{n[:2]} {n[2:5]} {n[5:]}',
+        lambda n: f'+254-7{n[:2]}-{n[2:]}',
+    )
+    pool = [rnd.choice(formats)(f'{rnd.randrange(10 ** 8):08d}') for _i in range(distinct)]
+    return [rnd.choice(pool) for _i in range(count)]
+
+
+def timed(label, func, numbers, runs):
+    best = None
+    for _run in range(runs):
+        start = time.perf_counter()
+        func(numbers)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<22} {best:8.3f} s   {len(numbers) / best / 1e6:6.2f} M numbers/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--numbers', type=int, default=1000000)
+    parser.add_argument('--distinct', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=3, help="best of RUNS, caches cleared before each")
+    args = parser.parse_args()
+
+    sms_at, phone_check = load_tools()
+    numbers = make_numbers(args.numbers, args.distinct)
+    print(f"{args.numbers} numbers, {args.distinct} distinct, best of {args.runs}, cold caches")
+
+    def cold(func):
+        def run(values):
+            sms_at.normalize_phone_number.cache_clear()
+            phone_check.check_phone_number.cache_clear()
+            phone_check._check_normalized.cache_clear()
+            return func(values)
+        return run
+
+    timed('per-call re.sub', lambda values: [normalize_uncached(n) for n in values], numbers, args.runs)
+    timed('per-call memoised', cold(lambda values: [sms_at.normalize_phone_number(n) for n in values]),
+          numbers, args.runs)
+    timed('batch', cold(sms_at.normalize_phone_numbers), numbers, args.runs)
+    timed('check per-call', cold(lambda values: [phone_check.check_phone_number(n) for n in values]),
+          numbers, args.runs)
+    timed('check batch', cold(phone_check.check_phone_numbers), numbers, args.runs)
+
+    # The batch APIs must answer exactly like the per-number ones
+    sample = numbers[:10000] + ['', '0722 000 001', '07123', '+44 20 7946 0958']
+    assert sms_at.normalize_phone_numbers(sample) == [normalize_uncached(n) for n in sample]
+    assert phone_check.check_phone_numbers(sample) == [phone_check.check_phone_number(n) for n in sample]
+
+
+if __name__ == '__main__':
+    main()
@@ -42,6 +42,12 @@ const STATE_BADGE_CLASS = {
     failed:  "bg-danger",
 };
 
+const CIRCUIT_BADGE_CLASS = {
+    closed:    "bg-success",
+    open:      "bg-danger",
+    half_open: "bg-warning text-dark",
+};
+
 export class SuSmsDashboard extends Component {
     static template = "su_sms_integrated.Dashboard";
     static props = {
@@ -62,6 +68,8 @@ export class SuSmsDashboard extends Component {
             balanceError:   null,
             messages:       [],
             deptStats:      [],
+            circuits:       [],
+            wsCache:        false,
             totalSent:      0,
             totalCost:      0,
             campaignCount:  0,
@@ -80,6 +88,8 @@ export class SuSmsDashboard extends Component {
             const result = await rpc("/su_sms/dashboard_stats", {});
             this.state.messages      = result.messages   || [];
             this.state.deptStats     = result.dept_stats || [];
+            this.state.circuits      = result.circuits   || [];
+            this.state.wsCache       = result.ws_cache   || false;
             this.state.totalSent     = result.total_sent || 0;
             this.state.totalCost     = result.total_cost || 0;
             this.state.campaignCount = this.state.messages.length;
@@ -153,6 +163,7 @@ export class SuSmsDashboard extends Component {
     typeLabel(type)  { return TYPE_LABELS[type]      || type;          }
     typeBadge(type)  { return TYPE_BADGE_CLASS[type]  || "bg-secondary"; }
     stateBadge(state){ return STATE_BADGE_CLASS[state] || "bg-secondary"; }
+    circuitBadge(state){ return CIRCUIT_BADGE_CLASS[state] || "bg-secondary"; }
 }
 
 registry.category("actions").add("su_sms_dashboard", SuSmsDashboard);
\ No newline at end of file
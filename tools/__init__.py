@@ -1,6 +1,19 @@
 # tools/__init__.py
 
+from . import at_batch_tuning
+from . import at_rate_limit
+from . import circuit_breaker
+from . import db_concurrency
+from . import at_transport
+from . import at_async
 from . import sms_api
 from . import sms_at
+from . import sms_template
+from . import phone_check
+from . import recipient_dedupe
+from . import csv_stream
+from . import recipient_cache
+from . import ws_cache
+from . import json_stream
 from . import webservice
 from . import kfs5
\ No newline at end of file
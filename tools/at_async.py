@@ -0,0 +1,137 @@
+# tools/at_async.py
+
+"""
+Asyncio send engine for very large Africa's Talking campaigns.
+
+Instead of one thread per parallel request, a single event loop keeps a
+window of bulk requests in flight over a small keep-alive connection pool
+(aiohttp).  Used by SmsApiAT._dispatch_at_chunks when the company's send
+engine is 'async'; results come back in the same order as the chunks, so
+the per-UUID result contract of _send_sms_batch does not change.
+
+aiohttp is optional: when it is not installed, is_async_engine_available()
+returns False and the caller falls back to the thread pool.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency
+    aiohttp = None
+
+from odoo.addons.su_sms_integrated.tools.at_rate_limit import get_at_rate_limiter
+from odoo.addons.su_sms_integrated.tools.circuit_breaker import get_at_circuit_breaker
+from odoo.addons.su_sms_integrated.tools.at_transport import AT_HTTP_TIMEOUT, AT_POOL_SIZE
+from odoo.addons.su_sms_integrated.tools.sms_at import at_http_failure_type, at_request_error
+
+_logger = logging.getLogger(__name__)
+
+# Default number of bulk requests kept in flight at once
+AT_ASYNC_WINDOW = 32
+
+
+def is_async_engine_available():
+    return aiohttp is not None
+
+
+def send_chunks_async(credentials, requests_list, window=AT_ASYNC_WINDOW, timings=None):
+    """
+    Send every (recipient_list, body) pair of ``requests_list`` from a
+    private event loop. Must be called from a thread without a running loop
+    (any Odoo request or cron thread).
+
+    :param timings: optional list collecting (seconds, failed) per HTTP call
+    :return: list of AT responses (or None on error), in input order
+    """
+    return asyncio.run(_send_all(credentials, requests_list, max(window or 1, 1), timings))
+
+
+async def _send_all(credentials, requests_list, window, timings=None):
+    connect_timeout, read_timeout = AT_HTTP_TIMEOUT
+    connector = aiohttp.TCPConnector(
+        limit=min(window, AT_POOL_SIZE),
+        keepalive_timeout=30,
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout),
+        headers={
+            'apiKey': credentials['api_key'],
+            'Accept': 'application/json',
+        },
+    )
+    in_flight = asyncio.Semaphore(window)
+    limiter = get_at_rate_limiter(credentials)
+    breaker = get_at_circuit_breaker(credentials)
+    loop = asyncio.get_running_loop()
+
+    async def _send_one(recipient_list, message_body):
+        async with in_flight:
+            # Limiter and breaker block on their own DB cursors - keep them off the loop
+            if not await loop.run_in_executor(None, breaker.allow):
+                _logger.warning(
+                    "AT SMS API: circuit open for company %s - not sending %d recipients",
+                    credentials['company_id'], len(recipient_list),
+                )
+                return None
+            if limiter and not await loop.run_in_executor(
+                None, limiter.acquire, len(recipient_list),
+            ):
+                return None
+            start = time.monotonic()
+            response, error = await _post(session, credentials, recipient_list, message_body)
+            if timings is not None and (response is not None or error):
+                timings.append((time.monotonic() - start, bool(error)))
+            # Never raises (see CircuitBreaker): a bookkeeping error must not
+            # cancel the gather and lose the results of chunks already sent
+            if error:
+                await loop.run_in_executor(None, breaker.record_failure, error)
+            else:
+                # AT answered, refused 4xx requests included - the service
+                # itself is up, as in SmsApiAT._call_at_api
+                await loop.run_in_executor(None, breaker.record_success)
+            return response
+
+    async with session:
+        return await asyncio.gather(*(
+            _send_one(to_list, body) for to_list, body in requests_list
+        ))
+
+
+async def _post(session, credentials, recipient_list, message_body):
+    """
+    One bulk send. Returns (response, error): the decoded AT response or
+    None, and the error to count against the circuit breaker (network
+    errors and 5xx only) or None.
+    """
+    try:
+        async with session.post(
+            credentials['endpoint'],
+            data={
+                'username': credentials['username'],
+                'to':       ','.join(recipient_list),
+                'message':  message_body,
+            },
+        ) as resp:
+            text = await resp.text()
+            if resp.status >= 400:
+                error = f"HTTP {resp.status}: {text[:300]}"
+                _logger.warning("AT SMS API error: %s", error)
+                if resp.status >= 500:
+                    return None, error
+                if at_http_failure_type(resp.status) == 'sms_server':
+                    return None, None  # throttled (429): retried
+                return at_request_error(resp.status, error), None
+            try:
+                return json.loads(text), None
+            except ValueError:
+                _logger.warning("AT SMS API error: invalid JSON from AT: %s", text[:300])
+                return None, None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        error = str(exc) or type(exc).__name__
+        _logger.warning("AT SMS API error: %s", error)
+        return None, error
@@ -0,0 +1,106 @@
+# tools/at_batch_tuning.py
+
+"""
+Adaptive chunk sizing for Africa's Talking bulk requests.
+
+After every bulk send, SmsApiAT reports each request's latency and whether
+it failed (timeout, network error, 5xx).  The company's chunk size is then
+adjusted AIMD-style within [AT_BATCH_MIN, AT_BATCH_MAX]:
+
+  * any failure in the round           -> halve
+  * smoothed latency above the target  -> shrink by a quarter
+  * smoothed latency well below target -> grow by AT_BATCH_STEP
+
+Latency and error rate are kept as exponentially weighted averages, and the
+learned size is persisted in su_sms_batch_tuning (updated on a short-lived
+cursor of its own, so concurrent senders never hold a lock for the length
+of their send).
+"""
+
+import logging
+
+from odoo.sql_db import db_connect
+
+_logger = logging.getLogger(__name__)
+
+# Bounds for recipients per AT API call (AT supports bulk mode natively)
+AT_BATCH_MIN = 50
+AT_BATCH_MAX = 500
+AT_BATCH_STEP = 50
+
+# Requests slower than this (seconds, smoothed) make the batch shrink
+AT_BATCH_TARGET_LATENCY = 15.0
+
+# Weight of the latest round in the moving averages
+_EWMA_ALPHA = 0.3
+
+
+def get_batch_size(cr, company_id):
+    """Learned chunk size for ``company_id``, AT_BATCH_MAX until something is learned."""
+    cr.execute(
+        "SELECT batch_size FROM su_sms_batch_tuning WHERE company_id = %s",
+        [company_id],
+    )
+    row = cr.fetchone()
+    size = row[0] if row and row[0] else AT_BATCH_MAX
+    return min(max(size, AT_BATCH_MIN), AT_BATCH_MAX)
+
+
+def record_batch_round(dbname, company_id, timings):
+    """
+    Fold one round of ``timings`` - a list of (seconds, failed) per AT
+    request - into the company's averages and adjust its chunk size.
+    Returns the new chunk size.
+    """
+    if not timings:
+        return None
+    errors = sum(1 for _elapsed, failed in timings if failed)
+    ok_latencies = [elapsed for elapsed, failed in timings if not failed]
+    error_rate = errors / len(timings)
+
+    with db_connect(dbname).cursor() as cr:
+        cr.execute("""
+            INSERT INTO su_sms_batch_tuning (company_id, batch_size, latency, error_rate)
+            VALUES (%s, %s, 0, 0)
+            ON CONFLICT (company_id) DO NOTHING
+        """, [company_id, AT_BATCH_MAX])
+        cr.execute("""
+            SELECT batch_size, latency, error_rate
+              FROM su_sms_batch_tuning
+             WHERE company_id = %s
+               FOR UPDATE
+        """, [company_id])
+        size, latency, avg_error_rate = cr.fetchone()
+        size = size or AT_BATCH_MAX
+
+        avg_error_rate = _EWMA_ALPHA * error_rate + (1 - _EWMA_ALPHA) * (avg_error_rate or 0.0)
+        if ok_latencies:
+            round_latency = sum(ok_latencies) / len(ok_latencies)
+            latency = (
+                _EWMA_ALPHA * round_latency + (1 - _EWMA_ALPHA) * latency
+                if latency else round_latency
+            )
+
+        if errors:
+            new_size = size // 2
+        elif latency and latency > AT_BATCH_TARGET_LATENCY:
+            new_size = int(size * 0.75)
+        elif latency and latency < AT_BATCH_TARGET_LATENCY / 2:
+            new_size = size + AT_BATCH_STEP
+        else:
+            new_size = size
+        new_size = min(max(new_size, AT_BATCH_MIN), AT_BATCH_MAX)
+
+        cr.execute("""
+            UPDATE su_sms_batch_tuning
+               SET batch_size = %s, latency = %s, error_rate = %s,
+                   updated_at = NOW() AT TIME ZONE 'UTC'
+             WHERE company_id = %s
+        """, [new_size, latency or 0.0, avg_error_rate, company_id])
+
+    if new_size != size:
+        _logger.info(
+            "AT batch size for company %s: %d -> %d (latency %.2fs, errors %d/%d)",
+            company_id, size, new_size, latency or 0.0, errors, len(timings),
+        )
+    return new_size
@@ -0,0 +1,129 @@
+# tools/at_rate_limit.py
+
+"""
+Per-company token-bucket rate limiter for outbound Africa's Talking calls.
+
+Two buckets are kept per company: messages/sec (one token per recipient)
+and requests/sec (one token per bulk call).  Bucket state lives in the
+su_sms_rate_bucket table and is updated under a row lock on a short-lived
+cursor of its own, so every Odoo worker, cron thread and dispatch thread
+shares the same budget.  PostgreSQL's clock is used for refills, so workers
+on different hosts agree on elapsed time.
+
+A chunk larger than the message bucket is charged in full, leaving the bucket
+in debt (negative) until it refills. A sender that finds the bucket empty sleeps until enough tokens have been
+refilled instead of failing; only after AT_RATE_LIMIT_MAX_WAIT seconds does
+acquire() give up.
+
+Safe to use from worker threads: it never touches the ORM environment.
+"""
+
+import logging
+import time
+
+from odoo.sql_db import db_connect
+
+_logger = logging.getLogger(__name__)
+
+# Longest a single request waits for tokens before giving up (seconds)
+AT_RATE_LIMIT_MAX_WAIT = 120
+
+# Cap on a single sleep so a changed limit is picked up quickly
+_MAX_SLEEP = 5.0
+
+
+class AtRateLimiter:
+
+    def __init__(self, dbname, company_id, messages_per_sec, requests_per_sec):
+        self.dbname           = dbname
+        self.company_id       = company_id
+        self.messages_per_sec = float(messages_per_sec or 0)
+        self.requests_per_sec = float(requests_per_sec or 0)
+
+    def acquire(self, messages, max_wait=AT_RATE_LIMIT_MAX_WAIT):
+        """
+        Block until one request carrying ``messages`` recipients may be sent.
+        Returns True when the tokens were taken, False after ``max_wait``.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._try_acquire(messages)
+            if wait <= 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _logger.warning(
+                    "AT rate limit: gave up after %ss waiting for tokens (company %s)",
+                    max_wait, self.company_id,
+                )
+                return False
+            _logger.debug("AT rate limit: waiting %.2fs (company %s)", wait, self.company_id)
+            time.sleep(min(wait, remaining, _MAX_SLEEP))
+
+    def _try_acquire(self, messages):
+        """
+        Refill both buckets, take the tokens if available.
+        Returns 0 on success, otherwise the estimated seconds to wait.
+        """
+        msg_rate, req_rate = self.messages_per_sec, self.requests_per_sec
+        # A chunk larger than one second's budget would never fit: it may go
+        # once the bucket is full, but is charged in full. The bucket goes
+        # into debt and later chunks wait until it has refilled, so the
+        # average stays at msg_rate.
+        msg_needed = float(messages)
+        msg_ready = min(msg_needed, msg_rate)
+
+        with db_connect(self.dbname).cursor() as cr:
+            cr.execute("""
+                INSERT INTO su_sms_rate_bucket (company_id, msg_tokens, req_tokens, refilled_at)
+                VALUES (%s, %s, %s, clock_timestamp() AT TIME ZONE 'UTC')
+                ON CONFLICT (company_id) DO NOTHING
+            """, [self.company_id, self.messages_per_sec, self.requests_per_sec])
+            cr.execute("""
+                SELECT msg_tokens, req_tokens,
+                       EXTRACT(EPOCH FROM (clock_timestamp() AT TIME ZONE 'UTC') - refilled_at)
+                  FROM su_sms_rate_bucket
+                 WHERE company_id = %s
+                   FOR UPDATE
+            """, [self.company_id])
+            msg_tokens, req_tokens, elapsed = cr.fetchone()
+            elapsed = max(float(elapsed or 0.0), 0.0)
+
+            # A rate of 0 means "no limit" for that bucket
+            msg_tokens = min(msg_rate, (msg_tokens or 0.0) + elapsed * msg_rate)
+            req_tokens = min(req_rate, (req_tokens or 0.0) + elapsed * req_rate)
+            msg_short = (msg_ready - msg_tokens) if msg_rate else 0.0
+            req_short = (1 - req_tokens) if req_rate else 0.0
+
+            if msg_short <= 0 and req_short <= 0:
+                msg_tokens -= msg_needed if msg_rate else 0
+                req_tokens -= 1 if req_rate else 0
+                wait = 0.0
+            else:
+                wait = max(
+                    msg_short / msg_rate if msg_short > 0 else 0.0,
+                    req_short / req_rate if req_short > 0 else 0.0,
+                )
+
+            cr.execute("""
+                UPDATE su_sms_rate_bucket
+                   SET msg_tokens = %s, req_tokens = %s,
+                       refilled_at = clock_timestamp() AT TIME ZONE 'UTC'
+                 WHERE company_id = %s
+            """, [msg_tokens, req_tokens, self.company_id])
+        return wait
+
+
+def get_at_rate_limiter(credentials):
+    """
+    Return the limiter for the company in ``credentials`` (see
+    SmsApiAT._get_at_credentials), or None when no limit is configured.
+    """
+    if not credentials.get('rate_messages') and not credentials.get('rate_requests'):
+        return None
+    return AtRateLimiter(
+        credentials['dbname'],
+        credentials['company_id'],
+        credentials['rate_messages'],
+        credentials['rate_requests'],
+    )
@@ -0,0 +1,133 @@
+# tools/at_transport.py
+
+"""
+Native HTTP transport for the Africa's Talking messaging API.
+
+The official SDK builds a new client (and a new TLS connection) for every
+call.  This transport keeps one ``requests.Session`` per worker process and
+AT account, with a keep-alive connection pool sized for parallel chunk
+dispatch, and posts straight to AT_PRODUCTION_ENDPOINT / AT_SANDBOX_ENDPOINT.
+
+Sessions are keyed on the process id as well, so a prefork Odoo worker never
+reuses sockets inherited from its parent.
+
+    transport = get_at_transport(credentials)
+    response  = transport.send(['+254727374660'], 'Hello')
+"""
+
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds - a 500-recipient bulk call can take a while
+AT_HTTP_TIMEOUT = (10, 60)
+
+# Keep-alive connections per session; matches sms_api.AT_MAX_CONCURRENCY
+AT_POOL_SIZE = 16
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+class AtTransportError(Exception):
+    """Raised when AT cannot be reached or answers with an unusable response."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def transient(self):
+        """Network error or AT-side (5xx) failure - counts against the circuit breaker."""
+        return self.status_code is None or self.status_code >= 500
+
+
+class AtHttpTransport:
+    """Pooled, thread-safe client for POST {endpoint} (bulk SMS send)."""
+
+    def __init__(self, username, api_key, endpoint, pool_size=AT_POOL_SIZE):
+        self.username = username
+        self.endpoint = endpoint
+        self.session  = requests.Session()
+        self.session.headers.update({
+            'apiKey':       api_key,
+            'Accept':       'application/json',
+            'Content-Type': 'application/x-www-form-urlencoded',
+        })
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=0,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def send(self, recipient_list, message_body):
+        """
+        Send one bulk message. Returns the decoded AT response dict.
+        Raises AtTransportError on network errors or non-2xx responses.
+        """
+        try:
+            resp = self.session.post(
+                self.endpoint,
+                data={
+                    'username': self.username,
+                    'to':       ','.join(recipient_list),
+                    'message':  message_body,
+                },
+                timeout=AT_HTTP_TIMEOUT,
+            )
+        except requests.exceptions.RequestException as exc:
+            raise AtTransportError(str(exc)) from exc
+
+        if not resp.ok:
+            raise AtTransportError(
+                f"HTTP {resp.status_code}: {resp.text[:300]}", status_code=resp.status_code,
+            )
+        try:
+            return resp.json()
+        except ValueError as exc:
+            raise AtTransportError(
+                f"Invalid JSON from AT: {resp.text[:300]}", status_code=resp.status_code,
+            ) from exc
+
+    def close(self):
+        self.session.close()
+
+
+def get_at_transport(credentials):
+    """
+    Return the pooled transport for the AT account in ``credentials``
+    (see SmsApiAT._get_at_credentials), creating it on first use.
+    A changed API key or environment gets a fresh session.
+    """
+    key = (
+        os.getpid(),
+        credentials['company_id'],
+        credentials['username'],
+        credentials['api_key'],
+        credentials['endpoint'],
+    )
+    transport = _transports.get(key)
+    if transport is not None:
+        return transport
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            # Drop stale sessions: sockets inherited from the parent process are
+            # forgotten (not closed), outdated sessions of this company are closed
+            for old_key in [k for k in _transports if k[0] != key[0] or k[1] == key[1]]:
+                old = _transports.pop(old_key)
+                if old_key[0] == key[0]:
+                    old.close()
+            transport = AtHttpTransport(
+                credentials['username'], credentials['api_key'], credentials['endpoint'],
+            )
+            _transports[key] = transport
+            _logger.debug("AT transport: new pooled session for company %s", key[1])
+        return transport
@@ -0,0 +1,178 @@
+# tools/circuit_breaker.py
+
+"""
+Circuit breaker for outbound integrations (Africa's Talking, juba).
+
+  closed    - calls go through; consecutive failures are counted
+  open      - after `failure_threshold` consecutive failures, calls fail
+              fast (no network I/O) for `reset_timeout` seconds
+  half_open - after the timeout one probe call is let through; success
+              closes the circuit, failure re-opens it
+
+State lives in the su_sms_circuit_breaker table and is read/written on a
+short-lived cursor of its own, so all Odoo workers share it and it can be
+used from dispatch threads.  The healthy path costs one indexed SELECT per
+call; writes only happen on failures and state changes.
+
+The breaker is bookkeeping around calls that may already have gone out:
+its methods never raise. A database error (pool exhausted, lock timeout)
+is logged, allow() then lets the call through and a lost record_* is
+simply not counted - it must not throw away the results of a send.
+
+Thresholds come from system parameters:
+  su_sms.circuit_failure_threshold  (default 5)
+  su_sms.circuit_reset_timeout      (seconds, default 60)
+"""
+
+import logging
+
+from odoo.sql_db import db_connect
+
+_logger = logging.getLogger(__name__)
+
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
+
+
+def get_circuit_settings(env):
+    """Return (failure_threshold, reset_timeout) from system parameters."""
+    cfg = env['ir.config_parameter'].sudo()
+    try:
+        threshold = int(cfg.get_param('su_sms.circuit_failure_threshold', CIRCUIT_FAILURE_THRESHOLD))
+        timeout = int(cfg.get_param('su_sms.circuit_reset_timeout', CIRCUIT_RESET_TIMEOUT))
+    except (ValueError, TypeError):
+        threshold, timeout = CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+    return max(threshold, 1), max(timeout, 1)
+
+
+class CircuitBreaker:
+
+    def __init__(self, dbname, name, service, company_id=None,
+                 failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.dbname            = dbname
+        self.name              = name
+        self.service           = service
+        self.company_id        = company_id
+        self.failure_threshold = failure_threshold
+        self.reset_timeout     = reset_timeout
+
+    def allow(self):
+        """
+        Return True if a call may go out now. In the open state, the first
+        caller after reset_timeout becomes the half-open probe.
+        """
+        try:
+            return self._allow()
+        except Exception:
+            _logger.exception("Circuit %s: state unavailable, letting the call through", self.name)
+            return True
+
+    def record_success(self):
+        try:
+            self._record_success()
+        except Exception:
+            _logger.exception("Circuit %s: could not record a success", self.name)
+
+    def record_failure(self, error=None):
+        try:
+            self._record_failure(error)
+        except Exception:
+            _logger.exception("Circuit %s: could not record a failure", self.name)
+
+    def _allow(self):
+        with db_connect(self.dbname).cursor() as cr:
+            cr.execute(
+                "SELECT state FROM su_sms_circuit_breaker WHERE name = %s",
+                [self.name],
+            )
+            row = cr.fetchone()
+            if not row or row[0] == 'closed':
+                return True
+
+            # open or half-open: decide under lock so only one probe goes out
+            cr.execute("""
+                SELECT state,
+                       EXTRACT(EPOCH FROM (clock_timestamp() AT TIME ZONE 'UTC') - opened_at)
+                  FROM su_sms_circuit_breaker
+                 WHERE name = %s
+                   FOR UPDATE
+            """, [self.name])
+            state, elapsed = cr.fetchone()
+            if state == 'closed':
+                return True
+            if elapsed is not None and float(elapsed) < self.reset_timeout:
+                return False
+            # Timeout elapsed (or a previous probe never reported back): probe
+            cr.execute("""
+                UPDATE su_sms_circuit_breaker
+                   SET state = 'half_open',
+                       opened_at = clock_timestamp() AT TIME ZONE 'UTC'
+                 WHERE name = %s
+            """, [self.name])
+            _logger.info("Circuit %s: half-open, probing", self.name)
+            return True
+
+    def _record_success(self):
+        with db_connect(self.dbname).cursor() as cr:
+            cr.execute("""
+                UPDATE su_sms_circuit_breaker
+                   SET state = 'closed', failure_count = 0, opened_at = NULL
+                 WHERE name = %s
+                   AND (state != 'closed' OR failure_count != 0)
+             RETURNING id
+            """, [self.name])
+            if cr.fetchone():
+                _logger.info("Circuit %s: closed", self.name)
+
+    def _record_failure(self, error=None):
+        error = str(error or '')[:250]
+        with db_connect(self.dbname).cursor() as cr:
+            cr.execute("""
+                INSERT INTO su_sms_circuit_breaker (name, service, company_id, state, failure_count)
+                VALUES (%s, %s, %s, 'closed', 0)
+                ON CONFLICT (name) DO NOTHING
+            """, [self.name, self.service, self.company_id])
+            cr.execute("""
+                UPDATE su_sms_circuit_breaker
+                   SET failure_count = failure_count + 1,
+                       last_failure_at = clock_timestamp() AT TIME ZONE 'UTC',
+                       last_error = %s,
+                       state = CASE
+                           WHEN state = 'half_open' OR failure_count + 1 >= %s THEN 'open'
+                           ELSE state END,
+                       opened_at = CASE
+                           WHEN state = 'half_open' OR (state = 'closed' AND failure_count + 1 >= %s)
+                           THEN clock_timestamp() AT TIME ZONE 'UTC'
+                           ELSE opened_at END
+                 WHERE name = %s
+             RETURNING state, failure_count
+            """, [error, self.failure_threshold, self.failure_threshold, self.name])
+            state, failures = cr.fetchone()
+        if state == 'open':
+            _logger.warning(
+                "Circuit %s: open after %d consecutive failures (%s)",
+                self.name, failures, error,
+            )
+
+
+def get_at_circuit_breaker(credentials):
+    """Breaker for the AT account in ``credentials`` (see SmsApiAT._get_at_credentials)."""
+    threshold, timeout = credentials['circuit_settings']
+    return CircuitBreaker(
+        credentials['dbname'],
+        f"africas_talking.{credentials['company_id']}",
+        'africas_talking',
+        company_id=credentials['company_id'],
+        failure_threshold=threshold,
+        reset_timeout=timeout,
+    )
+
+
+def get_juba_circuit_breaker(env):
+    threshold, timeout = get_circuit_settings(env)
+    return CircuitBreaker(
+        env.cr.dbname, 'juba', 'juba',
+        failure_threshold=threshold,
+        reset_timeout=timeout,
+    )
@@ -0,0 +1,159 @@
+# tools/csv_stream.py
+
+"""
+Streaming CSV recipient ingestion for ad hoc uploads.
+
+Large alumni lists used to be base64-decoded, decoded to one string and
+parsed into a full list before insertion. Here every stage is lazy:
+
+    binary field -> raw byte stream -> incremental text decode
+                 -> csv rows -> (name, normalised number) pairs, de-duplicated
+
+so peak memory is a few read buffers plus the set of numbers already seen,
+whatever the file size. Feed the pairs to
+su.sms.detail._bulk_insert_recipients, which inserts them in fixed chunks.
+
+    pairs = iter_csv_recipients(open_binary_stream(message, 'csv_file'))
+"""
+
+import base64
+import binascii
+import csv
+import io
+import logging
+
+from odoo import _
+from odoo.exceptions import UserError
+
+from .sms_at import normalize_phone_number
+
+_logger = logging.getLogger(__name__)
+
+# Base64 characters decoded per read (multiple of 4 -> 48 KiB of raw bytes)
+_B64_READ_SIZE = 64 * 1024
+
+# Line breaks and padding spaces found in wrapped base64
+_B64_WHITESPACE = b' \t\r\n\v\f'
+
+NAME_COLUMNS = ('Name', 'name', 'Full Name', 'full_name')
+FIRSTNAME_COLUMNS = ('firstname', 'first_name')
+LASTNAME_COLUMNS = ('lastname', 'last_name')
+PHONE_COLUMNS = ('phone_number', 'Phone Number', 'Phone', 'phone', 'Number', 'number')
+MOBILE_COLUMNS = ('mobile_number', 'Mobile Number', 'mobile')
+
+
+class Base64Reader(io.RawIOBase):
+    """
+    Read-only raw stream that base64-decodes ``data`` slice by slice.
+    Line-wrapped input (base64.encodebytes, MIME clients) is accepted:
+    whitespace is dropped and only whole 4-character groups are decoded,
+    the rest is carried over to the next slice.
+    """
+
+    def __init__(self, data):
+        super().__init__()
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        self._data = memoryview(data)
+        self._pos = 0
+        self._carry = b''
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and (self._pos < len(self._data) or self._carry):
+            chunk = bytes(self._data[self._pos:self._pos + _B64_READ_SIZE])
+            self._pos += _B64_READ_SIZE
+            chunk = self._carry + chunk.translate(None, _B64_WHITESPACE)
+            if self._pos < len(self._data):
+                aligned = len(chunk) - len(chunk) % 4
+                chunk, self._carry = chunk[:aligned], chunk[aligned:]
+            else:
+                self._carry = b''
+            self._pending = base64.b64decode(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def get_field_attachment(record, field_name):
+    """The ir.attachment holding ``record[field_name]`` (empty when unsaved)."""
+    if not record.id:
+        return record.env['ir.attachment']
+    return record.env['ir.attachment'].sudo().search([
+        ('res_model', '=', record._name),
+        ('res_field', '=', field_name),
+        ('res_id', '=', record.id),
+    ], limit=1)
+
+
+def has_binary_value(record, field_name):
+    """Whether ``record[field_name]`` is set, without loading its content."""
+    return bool(record.with_context(bin_size=True)[field_name])
+
+
+def open_binary_stream(record, field_name):
+    """
+    Return a binary file object over ``record[field_name]``.
+    A stored attachment is read straight from the filestore; otherwise
+    (unsaved wizard, database storage) the base64 value is decoded lazily.
+    """
+    attachment = get_field_attachment(record, field_name)
+    if attachment.store_fname:
+        try:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        except OSError:
+            _logger.warning("SU SMS: attachment %s missing from filestore", attachment.id)
+    return io.BufferedReader(Base64Reader(record[field_name] or b''))
+
+
+def _first(row, columns):
+    for column in columns:
+        value = (row.get(column) or '').strip()
+        if value:
+            return value
+    return ''
+
+
+def extract_csv_recipient(row):
+    """
+    Return (name, phone) for one DictReader row. Supports the template
+    (firstname, lastname, phone_number, mobile_number) and the legacy
+    (Name, Phone Number) layout; mobile_number is the fallback number.
+    """
+    name = f"{_first(row, FIRSTNAME_COLUMNS)} {_first(row, LASTNAME_COLUMNS)}".strip()
+    if not name:
+        name = _first(row, NAME_COLUMNS)
+    phone = _first(row, PHONE_COLUMNS) or _first(row, MOBILE_COLUMNS)
+    return name, phone
+
+
+def iter_csv_recipients(stream, dedupe=True):
+    """
+    Yield (name, normalised number) pairs from a binary CSV stream, one row
+    at a time. Rows without a number are skipped; with ``dedupe`` only the
+    first row of each number is kept. The stream is closed when exhausted.
+    A malformed file raises UserError wherever the error is found, so the
+    caller's transaction rolls back instead of keeping a partial list.
+    """
+    seen = set()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        for row in csv.DictReader(text):
+            name, phone = extract_csv_recipient(row)
+            number = normalize_phone_number(phone)
+            if not number or number == '+':
+                continue
+            if dedupe:
+                if number in seen:
+                    continue
+                seen.add(number)
+            yield name, number
+    except (csv.Error, binascii.Error) as exc:
+        _logger.warning("SU SMS CSV parse error: %s", exc)
+        raise UserError(_('Could not parse CSV: %s', str(exc))) from exc
+    finally:
+        text.close()
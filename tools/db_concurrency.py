@@ -0,0 +1,17 @@
+# tools/db_concurrency.py
+
+"""
+PostgreSQL errors raised when two jobs touch the same rows at once.
+
+The send-queue cron and the retry cron both send campaign recipients and
+refresh campaign counters. The loser of such a race skips the step; the
+next chunk or cron run catches up.
+"""
+
+from psycopg2 import errors as pg_errors
+
+PG_CONCURRENCY_ERRORS = (
+    pg_errors.SerializationFailure,
+    pg_errors.LockNotAvailable,
+    pg_errors.DeadlockDetected,
+)
@@ -0,0 +1,131 @@
+# tools/json_stream.py
+
+"""
+Incremental parsing of juba's JSON record listings.
+
+resp.json() on a full-staff or whole-school pull decodes the entire body,
+then callers build a list of dicts and a list of (name, phone) tuples from
+it. iter_json_records() instead reads the body chunk by chunk and yields one
+record dict at a time, so only the current record (plus a read buffer) is
+held in memory. Every response shape juba returns is handled:
+
+    [ {...}, {...} ]                              bare array
+    { "data": [ {...}, ... ], "total": 123 }      wrapped in data / students /
+                                                  staff / results / records
+    { ... }                                       single object -> one record
+
+Pure standard library: json.JSONDecoder.raw_decode over a sliding buffer.
+
+    records = iter_json_records(resp.iter_content(chunk_size=65536))
+"""
+
+import codecs
+import json
+
+# Keys juba (and its proxies) wrap a record array in, in lookup order
+WRAPPER_KEYS = ('data', 'students', 'staff', 'results', 'records')
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _TextBuffer:
+    """Sliding text window over an iterable of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self):
+        """Append the next chunk; False once the stream is exhausted."""
+        if self.exhausted:
+            return False
+        # Drop consumed text so the window stays around one record
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._decoder.decode(chunk)
+                return True
+        self.text += self._decoder.decode(b'', final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or '' at end of input."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Unexpected {char!r} in JSON stream, expected one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def value(self, decoder=json.JSONDecoder()):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number at the very end of the window may still be growing
+            if end >= len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_array(buf):
+    """Yield the items of the array whose '[' is next in ``buf``."""
+    buf.expect('[')
+    if buf.peek() == ']':
+        buf.pos += 1
+        return
+    while True:
+        yield buf.value()
+        if buf.expect(',]') == ']':
+            return
+
+
+def iter_json_records(chunks):
+    """
+    Yield record dicts from a JSON body given as an iterable of byte chunks.
+    Raises ValueError (json.JSONDecodeError) on malformed input.
+    """
+    buf = _TextBuffer(chunks)
+    first = buf.peek()
+    if first == '[':
+        yield from _iter_array(buf)
+        return
+    if first != '{':
+        raise ValueError("JSON stream is neither an array nor an object")
+
+    # Object: stream the first wrapper array found, keep the other members
+    members = {}
+    buf.expect('{')
+    if buf.peek() == '}':
+        yield members
+        return
+    while True:
+        key = buf.value()
+        buf.expect(':')
+        if key in WRAPPER_KEYS and buf.peek() == '[':
+            yield from _iter_array(buf)
+            return
+        members[key] = buf.value()
+        if buf.expect(',}') == '}':
+            break
+    # No wrapper array: the object is itself a single record
+    yield members
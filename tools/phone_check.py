@@ -0,0 +1,136 @@
+# tools/phone_check.py
+
+"""
+Pre-send validation of recipient numbers.
+
+Africa's Talking charges a round trip (and a slot in the rate limit) only to
+answer InvalidPhoneNumber / NotNetworkSubscriber for numbers we could have
+rejected ourselves. check_phone_numbers() classifies numbers in bulk before
+they reach SmsApiAT:
+
+  valid    - a Kenyan mobile number on an allocated operator prefix, or a
+             foreign number phonenumbers accepts
+  flagged  - plausible but unverified: an unlisted Kenyan mobile prefix, or
+             a foreign number while phonenumbers is not installed. Sent.
+  invalid  - wrong length, Kenyan fixed line, or rejected by phonenumbers.
+             Failed locally with sms_number_format, never sent.
+
+Kenyan numbers (the bulk of our traffic) are checked against the
+precomputed prefix table below without parsing; every number also gets the
+carrier it was allocated to. phonenumbers is optional and only consulted
+for foreign numbers.
+
+Results are memoised like normalize_phone_number. check_phone_numbers
+normalises its list with normalize_phone_numbers first, so a batch full of
+the same parents' numbers is classified once per distinct number.
+"""
+
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+try:
+    import phonenumbers
+    from phonenumbers import carrier as phonenumbers_carrier
+except ImportError:  # optional dependency
+    phonenumbers = None
+
+from .sms_at import PHONE_CACHE_SIZE, normalize_phone_number, normalize_phone_numbers
+
+_logger = logging.getLogger(__name__)
+
+PhoneCheck = namedtuple('PhoneCheck', ['number', 'verdict', 'carrier', 'reason'])
+
+# +254 followed by a 9-digit national number
+_KE_PREFIX = '+254'
+_KE_LENGTH = len(_KE_PREFIX) + 9
+
+# Mobile number ranges as allocated by the Communications Authority of Kenya,
+# as (first, last, carrier) over the first three national digits
+_KE_MOBILE_RANGES = (
+    (100, 102, 'Airtel'),
+    (110, 115, 'Safaricom'),
+    (700, 729, 'Safaricom'),
+    (730, 739, 'Airtel'),
+    (740, 743, 'Safaricom'),
+    (745, 746, 'Safaricom'),
+    (747, 747, 'JTL'),
+    (748, 748, 'Safaricom'),
+    (750, 756, 'Airtel'),
+    (757, 759, 'Safaricom'),
+    (762, 762, 'Airtel'),
+    (763, 766, 'Equitel'),
+    (768, 769, 'Safaricom'),
+    (770, 779, 'Telkom'),
+    (780, 789, 'Airtel'),
+    (790, 799, 'Safaricom'),
+)
+
+# '712' -> 'Safaricom'
+KE_MOBILE_PREFIXES = {
+    str(prefix): carrier
+    for first, last, carrier in _KE_MOBILE_RANGES
+    for prefix in range(first, last + 1)
+}
+
+# E.164: at most 15 digits; shortest real national numbers are ~7 digits
+_E164_MIN_DIGITS = 7
+_E164_MAX_DIGITS = 15
+
+
+def is_phonenumbers_available():
+    return phonenumbers is not None
+
+
+def _check_foreign(number):
+    if number[1] == '0':
+        return PhoneCheck(number, 'invalid', '', "Country codes never start with 0")
+    digits = len(number) - 1
+    if not _E164_MIN_DIGITS <= digits <= _E164_MAX_DIGITS:
+        return PhoneCheck(number, 'invalid', '', "Invalid number length")
+    if phonenumbers is None:
+        return PhoneCheck(number, 'flagged', '', "Foreign number not verified")
+    try:
+        parsed = phonenumbers.parse(number)
+    except phonenumbers.NumberParseException as exc:
+        return PhoneCheck(number, 'invalid', '', str(exc))
+    if not phonenumbers.is_valid_number(parsed):
+        return PhoneCheck(number, 'invalid', '', "Not a valid phone number")
+    return PhoneCheck(number, 'valid', phonenumbers_carrier.name_for_number(parsed, 'en'), '')
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def check_phone_number(number):
+    """Normalise and classify one raw number; returns a PhoneCheck."""
+    return _check_normalized(normalize_phone_number(number))
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _check_normalized(normalized):
+    if not normalized or not normalized[1:].isdecimal():
+        return PhoneCheck(normalized, 'invalid', '', "Invalid or missing phone number")
+    if not normalized.startswith(_KE_PREFIX):
+        return _check_foreign(normalized)
+    if len(normalized) != _KE_LENGTH:
+        return PhoneCheck(normalized, 'invalid', '', "Kenyan numbers have 9 digits after +254")
+    national = normalized[len(_KE_PREFIX):]
+    if national[0] not in '71':
+        return PhoneCheck(normalized, 'invalid', '', "Kenyan fixed line, cannot receive SMS")
+    carrier = KE_MOBILE_PREFIXES.get(national[:3])
+    if not carrier:
+        return PhoneCheck(normalized, 'flagged', '', "Unlisted Kenyan mobile prefix")
+    return PhoneCheck(normalized, 'valid', carrier, '')
+
+
+def phone_e164(check):
+    """The number to store as su.sms.detail.phone_e164 for a PhoneCheck, or None."""
+    return check.number if check.verdict != 'invalid' else None
+
+
+def check_phone_numbers(numbers):
+    """check_phone_number over a list of raw numbers, in order."""
+    distinct = dict.fromkeys(numbers)
+    check = _check_normalized
+    for number, normalized in zip(list(distinct), normalize_phone_numbers(distinct)):
+        distinct[number] = check(normalized)
+    return [distinct[number] for number in numbers]
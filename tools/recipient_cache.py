@@ -0,0 +1,112 @@
+# tools/recipient_cache.py
+
+"""
+Per-process cache of parsed compose-wizard recipients, keyed by a content
+hash.
+
+The compose preview recomputes on every onchange touching the recipient
+fields, and action_send used to parse the same upload again. With the cache
+an upload (or manual list) is parsed once per worker; preview, recipient
+count and send all reuse the same tuple of (name, number) pairs.
+
+Entries are evicted least-recently-used once the cached pairs exceed
+RECIPIENT_CACHE_MAX_ROWS; a single list larger than that is never cached
+(callers stream it instead - see summarize_recipients).
+
+    key   = recipient_cache_key('adhoc', wizard.csv_file)
+    pairs = get_cached_recipients(key) or cache_recipients(key, parse())
+"""
+
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+# Total (name, number) pairs kept across all entries of one worker
+RECIPIENT_CACHE_MAX_ROWS = 200000
+
+_cache = OrderedDict()
+_cache_rows = 0
+_cache_lock = threading.Lock()
+
+
+def recipient_cache_key(kind, content):
+    """Hash ``content`` (str or bytes) together with the parser ``kind``."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return f"{kind}:{hashlib.sha256(content or b'').hexdigest()}"
+
+
+def get_cached_recipients(key, max_age=None):
+    """
+    Return the cached tuple of pairs for ``key``, or None. With ``max_age``
+    (seconds) older entries count as missing - used for web-service lists,
+    which change upstream while uploads never do.
+    """
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        cached_at, pairs = entry
+        if max_age is not None and time.monotonic() - cached_at > max_age:
+            return None
+        _cache.move_to_end(key)
+        return pairs
+
+
+def cache_recipients(key, pairs):
+    """
+    Consume ``pairs`` and cache them under ``key``. Returns the tuple, or
+    None when the list is too large to cache - the iterator is then
+    partially consumed and the caller must parse again.
+    """
+    global _cache_rows
+    pairs = tuple(itertools.islice(pairs, RECIPIENT_CACHE_MAX_ROWS + 1))
+    if len(pairs) > RECIPIENT_CACHE_MAX_ROWS:
+        return None
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_rows -= len(old[1])
+        _cache[key] = (time.monotonic(), pairs)
+        _cache_rows += len(pairs)
+        while _cache_rows > RECIPIENT_CACHE_MAX_ROWS:
+            _old_key, (_cached_at, old_pairs) = _cache.popitem(last=False)
+            _cache_rows -= len(old_pairs)
+        return pairs
+
+
+def iter_and_cache_recipients(key, pairs):
+    """
+    Yield ``pairs`` (e.g. a streamed data-service result) and cache them
+    under ``key`` once fully consumed, unless they exceed
+    RECIPIENT_CACHE_MAX_ROWS - the buffer is dropped as soon as they do.
+    """
+    buffer = []
+    for pair in pairs:
+        if buffer is not None:
+            buffer.append(pair)
+            if len(buffer) > RECIPIENT_CACHE_MAX_ROWS:
+                buffer = None
+        yield pair
+    if buffer is not None:
+        cache_recipients(key, buffer)
+
+
+def summarize_recipients(pairs, limit, offset=0, search=None):
+    """
+    Return (``limit`` pairs starting at ``offset``, total count) in one pass
+    over ``pairs``. ``search`` keeps pairs whose name or number contains it
+    (case-insensitive); the count is then the number of matches.
+    """
+    if search:
+        needle = search.strip().lower()
+        pairs = (p for p in pairs if needle in (p[0] or '').lower() or needle in (p[1] or '').lower())
+    page = []
+    count = 0
+    for pair in pairs:
+        if offset <= count < offset + limit:
+            page.append(pair)
+        count += 1
+    return page, count
@@ -0,0 +1,82 @@
+# tools/recipient_dedupe.py
+
+"""
+De-duplication of campaign recipients on the normalised number.
+
+Siblings share parents, so a student pull with parents ticked yields the same
+father/mother number once per child, and CSV uploads often repeat rows.
+Each of those rows used to become its own su.sms.detail and its own paid AT
+message. RecipientDeduper collapses them while the recipients stream by:
+the first row of each number (keyed on E.164) is yielded for insertion
+straight away, later rows only update a merge record, applied to the
+inserted rows once the stream is exhausted:
+
+    ('Father of Alice', '0722000001')      -> inserted as 'Father of Alice'
+    ('Father of Bob',   '+254722000001')   -> merge: 2 rows,
+                                              'Father of Alice, Father of Bob'
+
+Memory is one key and first name per distinct number, plus the merge
+records of numbers that actually repeat. The collapsed row count is kept as
+su.sms.detail.recipient_count, the merged names as merged_names; the
+recipient name itself stays the first row's, for display and templating.
+"""
+
+from collections import namedtuple
+
+from .phone_check import check_phone_number, phone_e164
+
+# Names kept on a merged recipient before the rest are summarised as "+N more"
+MERGED_NAMES_MAX = 3
+
+Recipient = namedtuple('Recipient', ['name', 'number', 'e164', 'carrier'])
+
+# key: phone_e164 of the inserted detail, or its raw phone_number when invalid
+# name: first non-empty name, for a detail whose first row had none
+RecipientMerge = namedtuple('RecipientMerge', ['key', 'count', 'name', 'names'])
+
+
+def _merged_names(names, extra):
+    if extra:
+        return f"{', '.join(names)} +{extra} more"
+    return ', '.join(names)
+
+
+class RecipientDeduper:
+
+    def __init__(self):
+        # key -> first name seen, for every distinct number
+        self._first_names = {}
+        # key -> [rows, distinct names (capped), names beyond MERGED_NAMES_MAX]
+        self._merges = {}
+
+    def iter_unique(self, pairs):
+        """Yield a Recipient for the first (name, number) pair of each number."""
+        first_names = self._first_names
+        merges = self._merges
+        check = check_phone_number
+        for name, number in pairs:
+            result = check(number)
+            e164 = phone_e164(result)
+            key = e164 or number
+            if key not in first_names:
+                first_names[key] = name
+                yield Recipient(name, number, e164, result.carrier)
+                continue
+            merge = merges.get(key)
+            if merge is None:
+                first = first_names[key]
+                merge = merges[key] = [1, [first] if first else [], 0]
+            merge[0] += 1
+            names = merge[1]
+            if name and name not in names:
+                if len(names) < MERGED_NAMES_MAX:
+                    names.append(name)
+                else:
+                    merge[2] += 1
+
+    def merges(self):
+        """RecipientMerge for every number seen more than once (after iter_unique)."""
+        return [
+            RecipientMerge(key, count, names[0] if names else '', _merged_names(names, extra))
+            for key, (count, names, extra) in self._merges.items()
+        ]
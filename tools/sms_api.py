@@ -25,23 +25,49 @@ Returns results in standard Odoo format:
 ]
 """
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import africastalking
+from africastalking.SMS import SMSService
 
 from odoo import _
 from odoo.addons.sms.tools.sms_api import SmsApiBase
 
+from odoo.addons.su_sms_integrated.tools.at_async import (
+    AT_ASYNC_WINDOW,
+    is_async_engine_available,
+    send_chunks_async,
+)
+from odoo.addons.su_sms_integrated.tools.at_batch_tuning import (
+    AT_BATCH_MAX,  # noqa: F401 - kept importable from here
+    get_batch_size,
+    record_batch_round,
+)
+from odoo.addons.su_sms_integrated.tools.at_rate_limit import get_at_rate_limiter
+from odoo.addons.su_sms_integrated.tools.at_transport import (
+    AtTransportError,
+    get_at_transport,
+)
+from odoo.addons.su_sms_integrated.tools.circuit_breaker import (
+    get_at_circuit_breaker,
+    get_circuit_settings,
+)
+from odoo.addons.su_sms_integrated.tools.phone_check import check_phone_numbers
 from odoo.addons.su_sms_integrated.tools.sms_at import (
+    AT_REQUEST_ERROR_KEY,
     AT_STATUS_TO_ODOO_FAILURE,
     AT_SUCCESS_STATUSES,
-    normalize_phone_number,
+    AT_UNMAPPED_FAILURE,
+    at_http_failure_type,
+    at_request_error,
+    get_at_messaging_endpoint,
     parse_at_cost,
 )
 
 _logger = logging.getLogger(__name__)
 
-# Maximum recipients per single AT API call (AT supports bulk mode natively)
-AT_BATCH_MAX = 500
+# Upper bound for parallel AT requests, whatever the company setting says
+AT_MAX_CONCURRENCY = 16
 
 
 class SmsApiAT(SmsApiBase):
@@ -52,6 +78,7 @@ class SmsApiAT(SmsApiBase):
         'at_insufficient_balance': 'at_insufficient_balance',
         'at_invalid_sender': 'at_invalid_sender',
         'at_number_format': 'sms_number_format',
+        'at_rejected': 'at_rejected',
         'sms_server': 'sms_server',
         'sms_number_format': 'sms_number_format',
         'sms_blacklist': 'sms_blacklist',
@@ -72,8 +99,12 @@ class SmsApiAT(SmsApiBase):
         :return: list of per-UUID result dicts
         """
         company = (self.company or self.env.company).sudo()
+        credentials = self._get_at_credentials(company)
 
         results = []
+        # (chunk, to_list, body, uuid_to_normalized) for every chunk that
+        # actually has to go out to AT
+        jobs = []
 
         for message in messages:
             body = message.get('content') or ''
@@ -82,24 +113,34 @@ class SmsApiAT(SmsApiBase):
             if not number_infos:
                 continue
 
-            # Normalise numbers and build uuid - normalised map
+            # Normalise and validate numbers, build uuid - normalised map.
+            # Numbers that cannot be delivered fail here, without an AT call.
+            raw_numbers = [info.get('number', '') for info in number_infos]
             uuid_to_normalized = {}
-            for info in number_infos:
-                raw = info.get('number', '')
-                normalized = normalize_phone_number(raw)
-                uuid_to_normalized[info['uuid']] = (raw, normalized)
+            sendable = []
+            for info, raw, check in zip(number_infos, raw_numbers, check_phone_numbers(raw_numbers)):
+                if check.verdict == 'invalid':
+                    results.append(self._at_failure_result(
+                        info['uuid'], 'sms_number_format', check.reason,
+                    ))
+                    continue
+                uuid_to_normalized[info['uuid']] = (raw, check.number)
+                sendable.append(info)
+            number_infos = sendable
+            if not number_infos:
+                continue
 
-            # AT allows up to AT_BATCH_MAX per call; split if needed
-            chunks = [number_infos[i:i + AT_BATCH_MAX]
-                      for i in range(0, len(number_infos), AT_BATCH_MAX)]
+            # Split into chunks of the company's learned batch size (<= AT_BATCH_MAX)
+            batch_size = credentials['batch_size']
+            chunks = [number_infos[i:i + batch_size]
+                      for i in range(0, len(number_infos), batch_size)]
 
             for chunk in chunks:
-                # Build number list for this chunk
-                to_list = []
-                for info in chunk:
-                    _, normalized = uuid_to_normalized[info['uuid']]
-                    if normalized:
-                        to_list.append(normalized)
+                # Build number list for this chunk, each number once: AT
+                # would charge every repeat and answer them indistinguishably
+                to_list = list(dict.fromkeys(
+                    uuid_to_normalized[info['uuid']][1] for info in chunk
+                ))
 
                 if not to_list:
                     for info in chunk:
@@ -109,33 +150,188 @@ class SmsApiAT(SmsApiBase):
                         ))
                     continue
 
-                at_response = self._call_at_api(company, to_list, body)
+                jobs.append((chunk, to_list, body, uuid_to_normalized))
+
+        # (seconds, failed) per request that reached the transport
+        timings = []
+        responses = self._dispatch_at_chunks(
+            credentials, [(to_list, body) for _chunk, to_list, body, _map in jobs],
+            timings=timings,
+        )
+        if timings:
+            # The chunks are sent: tuning must never cost their results
+            try:
+                record_batch_round(credentials['dbname'], credentials['company_id'], timings)
+            except Exception:
+                _logger.exception(
+                    "AT batch tuning: could not record the round for company %s",
+                    credentials['company_id'],
+                )
 
-                if at_response is None:
-                    for info in chunk:
-                        results.append(self._at_failure_result(
-                            info['uuid'], 'sms_server',
-                            _("Could not reach Africa's Talking API"),
-                        ))
-                    continue
+        for (chunk, _to_list, _body, uuid_to_normalized), at_response in zip(jobs, responses):
+            if at_response is None:
+                for info in chunk:
+                    results.append(self._at_failure_result(
+                        info['uuid'], 'sms_server',
+                        _("Could not reach Africa's Talking API"),
+                    ))
+                continue
+            request_error = at_response.get(AT_REQUEST_ERROR_KEY)
+            if request_error:
+                for info in chunk:
+                    results.append(self._at_failure_result(
+                        info['uuid'], request_error['failure_type'], request_error['reason'],
+                    ))
+                continue
 
-                results.extend(
-                    self._parse_at_response(at_response, chunk, uuid_to_normalized)
-                )
+            results.extend(
+                self._parse_at_response(at_response, chunk, uuid_to_normalized)
+            )
 
         return results
 
-    def _call_at_api(self, company, recipient_list, message_body):
-        """Send SMS via official Africa's Talking SDK. Returns response dict or None on error."""
+    def _get_at_credentials(self, company):
+        """
+        Snapshot the AT credentials and send settings of ``company`` into a
+        plain dict.
+
+        Chunks may be sent from worker threads, which must never touch the
+        ORM (the cursor and environment are not thread-safe), so everything
+        _call_at_api needs is read here, in the calling thread.
+        """
+        return {
+            'company_id': company.id,
+            'username': company.at_username or '',
+            'api_key': company.at_api_key or '',
+            'environment': company.at_environment or 'production',
+            'endpoint': get_at_messaging_endpoint(company),
+            'transport': company.at_transport or 'native',
+            'engine': company.at_send_engine or 'threads',
+            'concurrency': company.at_send_concurrency or 1,
+            'async_window': company.at_async_window or AT_ASYNC_WINDOW,
+            'dbname': self.env.cr.dbname,
+            'rate_messages': company.at_rate_messages or 0,
+            'rate_requests': company.at_rate_requests or 0,
+            'circuit_settings': get_circuit_settings(self.env),
+            'batch_size': get_batch_size(self.env.cr, company.id),
+        }
+
+    def _dispatch_at_chunks(self, credentials, requests_list, timings=None):
+        """
+        Send every (recipient_list, body) pair of ``requests_list`` to AT.
+
+        With the 'async' engine (native transport + aiohttp installed) all
+        chunks go through the asyncio engine with a window of in-flight
+        requests. Otherwise chunks are sent one after the other when the
+        company concurrency is 1 (or there is a single chunk), or through a
+        bounded thread pool.
+
+        :param timings: optional list collecting (seconds, failed) for every
+            request that reached the transport, for adaptive batch sizing
+        :return: list of AT responses (or None on error), in the same order
+            as ``requests_list``
+        """
+        if not requests_list:
+            return []
+
+        if credentials['engine'] == 'async' and len(requests_list) > 1:
+            if credentials['transport'] == 'native' and is_async_engine_available():
+                _logger.debug(
+                    "AT: dispatching %d chunks through the async engine (window %d)",
+                    len(requests_list), credentials['async_window'],
+                )
+                return send_chunks_async(
+                    credentials, requests_list,
+                    window=credentials['async_window'], timings=timings,
+                )
+            _logger.warning(
+                "AT: async send engine needs the native transport and aiohttp - "
+                "falling back to the thread pool"
+            )
+
+        workers = min(max(credentials['concurrency'], 1), AT_MAX_CONCURRENCY, len(requests_list))
+        if workers <= 1:
+            return [
+                self._call_at_api(credentials, to_list, body, timings=timings)
+                for to_list, body in requests_list
+            ]
+
+        _logger.debug(
+            "AT: dispatching %d chunks with %d parallel requests",
+            len(requests_list), workers,
+        )
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='su_sms_at') as pool:
+            return list(pool.map(
+                lambda req: self._call_at_api(credentials, req[0], req[1], timings=timings),
+                requests_list,
+            ))
+
+    def _call_at_api(self, credentials, recipient_list, message_body, timings=None):
+        """
+        Send one bulk request to Africa's Talking. Returns response dict or None on error.
+        A request AT refuses for good (HTTP 4xx other than 429) returns the
+        at_request_error() pseudo-response instead, so it is not retried.
+
+        Fails fast while the company's AT circuit breaker is open, then waits
+        for the shared rate limit and uses the pooled native transport unless
+        the company is configured for the SDK. Safe to call from worker
+        threads: only the ``credentials`` snapshot is used, never the ORM.
+
+        When ``timings`` is given, (seconds, failed) of the HTTP call itself
+        is appended to it - rate-limit waits are not counted.
+
+        Breaker bookkeeping never raises (see tools/circuit_breaker.py), so
+        a database error there cannot lose the response of a sent chunk.
+        """
+        breaker = get_at_circuit_breaker(credentials)
+        if not breaker.allow():
+            _logger.warning(
+                "AT SMS API: circuit open for company %s - not sending %d recipients",
+                credentials['company_id'], len(recipient_list),
+            )
+            return None
+        limiter = get_at_rate_limiter(credentials)
+        if limiter and not limiter.acquire(len(recipient_list)):
+            return None
+
+        start = time.monotonic()
         try:
-            africastalking.initialize(company.at_username or '', company.at_api_key or '')
-            sms = africastalking.SMS
-            response = sms.send(message_body, recipient_list)
-            return response
+            if credentials['transport'] == 'sdk':
+                response = self._call_at_sdk(credentials, recipient_list, message_body)
+            else:
+                response = get_at_transport(credentials).send(recipient_list, message_body)
+        except AtTransportError as exc:
+            _logger.warning("AT SMS API error: %s", exc)
+            if exc.transient:
+                breaker.record_failure(exc)
+                if timings is not None:
+                    timings.append((time.monotonic() - start, True))
+                return None
+            breaker.record_success()  # AT answered: the service itself is up
+            if at_http_failure_type(exc.status_code) == 'sms_server':
+                return None  # throttled (429): retried
+            return at_request_error(exc.status_code, str(exc))
         except Exception as exc:
             _logger.warning("AT SMS API error: %s", exc)
+            breaker.record_failure(exc)
+            if timings is not None:
+                timings.append((time.monotonic() - start, True))
             return None
 
+        if timings is not None:
+            timings.append((time.monotonic() - start, False))
+        breaker.record_success()
+        return response
+
+    def _call_at_sdk(self, credentials, recipient_list, message_body):
+        """
+        Fallback path through the official SDK. Uses a dedicated service
+        instance (``africastalking.initialize`` swaps module-level globals,
+        which races between threads). Raises on error.
+        """
+        sms = SMSService(credentials['username'], credentials['api_key'])
+        return sms.send(message_body, recipient_list)
+
     def _parse_at_response(self, at_data, chunk, uuid_to_normalized):
         """
         Parse AT response and match results back to Odoo UUIDs.
@@ -167,7 +363,9 @@ class SmsApiAT(SmsApiBase):
             if num:
                 at_by_number[num] = rec
 
-        # Match back to UUIDs
+        # Match back to UUIDs. A number repeated in the chunk was sent once
+        # (see _send_sms_batch): every UUID gets its result, the cost only once.
+        charged = set()
         for info in chunk:
             uuid = info['uuid']
             _, normalized = uuid_to_normalized.get(uuid, (None, None))
@@ -184,6 +382,10 @@ class SmsApiAT(SmsApiBase):
             cost = parse_at_cost(at_rec.get('cost'))
             at_message_id = at_rec.get('messageId')
 
+            if normalized in charged:
+                cost = 0.0
+            charged.add(normalized)
+
             if at_status in AT_SUCCESS_STATUSES:
                 results.append({
                     'uuid': uuid,
@@ -194,7 +396,7 @@ class SmsApiAT(SmsApiBase):
                     'at_message_id': at_message_id,
                 })
             else:
-                failure_type = AT_STATUS_TO_ODOO_FAILURE.get(at_status, 'sms_server')
+                failure_type = AT_STATUS_TO_ODOO_FAILURE.get(at_status, AT_UNMAPPED_FAILURE)
                 results.append({
                     'uuid': uuid,
                     'state': failure_type,
@@ -230,5 +432,6 @@ class SmsApiAT(SmsApiBase):
             'sms_blacklist': _("This number is blacklisted."),
             'sms_server': _("Africa's Talking server error - please try again."),
             'sms_acc': _("Account not whitelisted (sandbox restriction)."),
+            'at_rejected': _("Africa's Talking rejected the message."),
         })
         return error_dict
\ No newline at end of file
@@ -6,12 +6,20 @@ Mirrors sms_twilio/tools/sms_twilio.py in structure and purpose.
 """
 import re
 import logging
+from functools import lru_cache
 
 _logger = logging.getLogger(__name__)
 
 # Kenya country code is default when no country code present
 _DEFAULT_COUNTRY_CODE = '254'
 
+# Everything but digits and '+' is stripped from a phone number
+_PHONE_JUNK_RE = re.compile(r'[^\d+]')
+
+# Distinct numbers remembered by normalize_phone_number (siblings share
+# parents, campaigns are re-sent to the same cohorts)
+PHONE_CACHE_SIZE = 65536
+
 AT_PRODUCTION_ENDPOINT = 'https://api.africastalking.com/version1/messaging'
 AT_SANDBOX_ENDPOINT = 'https://api.sandbox.africastalking.com/version1/messaging'
 
@@ -32,9 +40,11 @@ def get_at_balance_endpoint(company):
     return AT_BALANCE_PRODUCTION
 
 
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
 def normalize_phone_number(number, default_country_code=_DEFAULT_COUNTRY_CODE):
     """
     Normalise a phone number to E.164 format expected by Africa's Talking.
+    Results are memoised (bounded LRU of PHONE_CACHE_SIZE numbers).
 
     Examples:
       '0727374660'   -> '+254727374660'
@@ -43,8 +53,13 @@ def normalize_phone_number(number, default_country_code=_DEFAULT_COUNTRY_CODE):
     """
     if not number:
         return None
-    # Strip all non-numeric characters except leading +
-    cleaned = re.sub(r'[^\d+]', '', number.strip())
+    if number[0] == '+' and number[1:].isdecimal():
+        return number  # already E.164, nothing to strip
+    if number.isdecimal():
+        cleaned = number
+    else:
+        # Strip all non-numeric characters except leading +
+        cleaned = _PHONE_JUNK_RE.sub('', number)
     if cleaned.startswith('+'):
         return cleaned  # already E.164
     if cleaned.startswith('0') and len(cleaned) == 10:
@@ -56,6 +71,25 @@ def normalize_phone_number(number, default_country_code=_DEFAULT_COUNTRY_CODE):
     return f'+{cleaned}'
 
 
+def normalize_phone_numbers(numbers, default_country_code=_DEFAULT_COUNTRY_CODE):
+    """
+    Normalise a list of phone numbers; returns a list in the same order
+    (None for empty entries). Each distinct number is normalised once,
+    through the memoised normalize_phone_number, and repeats are mapped
+    back from a dict (see scripts/bench_phone_normalize.py).
+    """
+    normalize = normalize_phone_number
+    distinct = dict.fromkeys(numbers)
+    if default_country_code == _DEFAULT_COUNTRY_CODE:
+        # Same call shape as single calls, so both share the LRU entries
+        for number in distinct:
+            distinct[number] = normalize(number)
+    else:
+        for number in distinct:
+            distinct[number] = normalize(number, default_country_code)
+    return [distinct[number] for number in numbers]
+
+
 def parse_at_cost(cost_str):
     """
     Parse AT cost string like 'KES 0.8000' to a float.
@@ -81,6 +115,41 @@ AT_STATUS_TO_ODOO_FAILURE = {
     'UserAccountSuspended': 'at_authentication',
     'AuthenticationFailed': 'at_authentication',
     'NumberNotWhitelisted': 'sms_acc',  # sandbox restriction
+    'UnsupportedNumberType': 'sms_number_format',
+    'DoNotDisturbRejection': 'sms_blacklist',
+    # AT-side trouble, retried
+    'InternalServerError': 'sms_server',
+    'GatewayError': 'sms_server',
 }
 
-AT_SUCCESS_STATUSES = {'Success'}
\ No newline at end of file
+# Any other AT failure status is permanent: failed, never retried
+AT_UNMAPPED_FAILURE = 'at_rejected'
+
+AT_SUCCESS_STATUSES = {'Success'}
+
+# Failure types worth retrying: AT unreachable, throttled, or no result returned
+AT_TRANSIENT_FAILURE_TYPES = {'sms_server'}
+
+# Key of the pseudo-response standing for a bulk request AT refused
+AT_REQUEST_ERROR_KEY = 'SuRequestError'
+
+
+def at_http_failure_type(status_code):
+    """Odoo failure_type for a bulk request answered with HTTP ``status_code``."""
+    if status_code in (401, 403):
+        return 'at_authentication'
+    if status_code is None or status_code == 429 or status_code >= 500:
+        return 'sms_server'
+    return AT_UNMAPPED_FAILURE
+
+
+def at_request_error(status_code, reason):
+    """
+    Pseudo AT response for a bulk request refused for good (HTTP 4xx, e.g. a
+    bad API key): every recipient of the request fails with a non-retried
+    failure type instead of the retried 'sms_server' of an unreachable AT.
+    """
+    return {AT_REQUEST_ERROR_KEY: {
+        'failure_type': at_http_failure_type(status_code),
+        'reason': reason,
+    }}
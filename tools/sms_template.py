@@ -0,0 +1,61 @@
+# tools/sms_template.py
+
+"""
+Per-recipient placeholders in campaign bodies.
+
+    "Dear {name}, your fee statement is ready."
+
+The body is split into literal text and placeholders once per campaign
+(compile_template, memoised), so rendering a recipient is a single join.
+Only the placeholders below are substituted; any other brace is literal
+text, so bodies written before templating existed are sent unchanged.
+
+  {name}   recipient display name: the detail's own name, never the merged
+           names of collapsed duplicates; su_sms.template_name_fallback
+           (default "Sir/Madam") when the recipient has no name
+  {phone}  recipient number
+
+Recipients that render to the same text still share AT bulk requests:
+sms.sms batches are grouped by body, and su.sms.message._send_details
+creates them ordered by rendered body so equal texts land in the same batch.
+"""
+
+import re
+from functools import lru_cache
+
+TEMPLATE_PLACEHOLDERS = ('name', 'phone')
+
+# {name} for recipients without a name
+TEMPLATE_NAME_FALLBACK = 'Sir/Madam'
+
+_PLACEHOLDER_RE = re.compile(r'\{(%s)\}' % '|'.join(TEMPLATE_PLACEHOLDERS))
+
+
+class SmsTemplate:
+
+    def __init__(self, body, name_fallback=TEMPLATE_NAME_FALLBACK):
+        self.body = body or ''
+        self.name_fallback = name_fallback
+        # re.split with one group: literal, placeholder, literal, ...
+        self.parts = _PLACEHOLDER_RE.split(self.body)
+        self.is_static = len(self.parts) == 1
+
+    def render(self, name='', phone=''):
+        if self.is_static:
+            return self.body
+        values = {'name': (name or '').strip() or self.name_fallback, 'phone': phone or ''}
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=64)
+def compile_template(body, name_fallback=TEMPLATE_NAME_FALLBACK):
+    return SmsTemplate(body, name_fallback)
+
+
+def get_template_name_fallback(env):
+    return env['ir.config_parameter'].sudo().get_param(
+        'su_sms.template_name_fallback', TEMPLATE_NAME_FALLBACK,
+    )
@@ -20,6 +20,10 @@ From the staff URL we derive the staff base:
 The service returns JSON arrays.  Field name normalisation handles both camelCase
 and underscore_case variants seen in Strathmore web services.
 
+Listings are parsed incrementally as the body arrives (tools/json_stream.py)
+and fed record by record through _parse_student_records / _parse_staff_records,
+so a whole-school pull never holds the decoded response in memory.
+
 RESPONSE SHAPE (expected from juba.strathmore.edu):
   Students:
     [
@@ -32,7 +36,8 @@ RESPONSE SHAPE (expected from juba.strathmore.edu):
       ...
     ]
 
-If the shape differs, adjust _parse_student_record / _parse_staff_record below.
+If the shape differs, adjust the field candidates below. Which candidate a
+response uses is resolved once per response (_RecordSchema), not per record.
 """
 
 import logging
@@ -44,8 +49,15 @@ from requests.exceptions import RequestException
 from odoo import _
 from odoo.exceptions import UserError
 
+from odoo.addons.su_sms_integrated.tools.circuit_breaker import get_juba_circuit_breaker
+from odoo.addons.su_sms_integrated.tools.json_stream import iter_json_records
+from odoo.addons.su_sms_integrated.tools.ws_cache import get_ws_cache
+
 _logger = logging.getLogger(__name__)
 
+# Bytes read from a juba response per iteration when streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
 # Field name candidates to try in order (student phone fields)
 _STUDENT_PHONE_FIELDS    = ('phone', 'mobilePhone', 'phoneNumber', 'mobile', 'phone_number')
 _STUDENT_FNAME_FIELDS    = ('name', 'fullName', 'full_name', 'studentName')
@@ -58,6 +70,20 @@ _STAFF_FNAME_FIELDS      = ('firstName', 'first_name', 'givenName')
 _STAFF_LNAME_FIELDS      = ('lastName', 'last_name', 'surname', 'familyName')
 _STAFF_FULLNAME_FIELDS   = ('name', 'fullName', 'full_name', 'staffName')
 _STAFF_DEPT_FIELDS       = ('department', 'departmentName', 'dept', 'departmentCode')
+_STAFF_DEPTCODE_FIELDS   = ('departmentCode', 'deptCode', 'department_code')
+
+# Directory mirror fields (see models/su_sms_directory.py)
+_STAFF_KEY_FIELDS        = ('staffNo', 'staffNumber', 'staff_no', 'employeeNo', 'username', 'userName')
+_STAFF_GENDER_FIELDS     = ('gender', 'sex')
+_STAFF_CATEGORY_FIELDS   = ('category', 'staffCategory', 'staff_category')
+_STAFF_JOBSTATUS_FIELDS  = ('jobStatusType', 'jobStatus', 'job_status')
+_STUDENT_KEY_FIELDS      = ('studentNo', 'studentNumber', 'student_no', 'admissionNo', 'regNo')
+_STUDENT_SCHOOL_FIELDS   = ('school', 'schoolName', 'schoolCode')
+_STUDENT_PROGRAM_FIELDS  = ('program', 'programme', 'programName', 'programCode')
+_STUDENT_COURSE_FIELDS   = ('course', 'courseName', 'courseCode')
+_STUDENT_INTAKE_FIELDS   = ('intake', 'intakeName')
+_STUDENT_ACYEAR_FIELDS   = ('academicYear', 'academic_year')
+_STUDENT_YEAR_FIELDS     = ('studentYear', 'yearOfStudy', 'year', 'student_year')
 
 
 def _first(record, *field_candidates):
@@ -69,46 +95,124 @@ def _first(record, *field_candidates):
     return ''
 
 
-def _parse_student_record(rec, include_student, include_father, include_mother):
+class _FieldResolver:
+    """
+    _first() for one field, bound to its candidate tuple once per response.
+    Every record is resolved in priority order on its own: a lower-priority
+    key seen first (e.g. 'dept') never hides a preferred one ('department')
+    that later records carry.
+    """
+    __slots__ = ('candidates',)
+
+    def __init__(self, candidates):
+        self.candidates = candidates
+
+    def __call__(self, rec):
+        get = rec.get
+        for f in self.candidates:
+            v = get(f)
+            if v:
+                return str(v).strip()
+        return ''
+
+
+class _RecordSchema:
+    """Field resolvers for the records of one response: schema.phone(rec) etc."""
+
+    def __init__(self, **candidates):
+        for attr, field_candidates in candidates.items():
+            setattr(self, attr, _FieldResolver(field_candidates))
+
+
+def _student_schema():
+    return _RecordSchema(
+        name=_STUDENT_FNAME_FIELDS,
+        phone=_STUDENT_PHONE_FIELDS,
+        father_phone=_FATHER_PHONE_FIELDS,
+        mother_phone=_MOTHER_PHONE_FIELDS,
+        key=_STUDENT_KEY_FIELDS,
+        school=_STUDENT_SCHOOL_FIELDS,
+        program=_STUDENT_PROGRAM_FIELDS,
+        course=_STUDENT_COURSE_FIELDS,
+        intake=_STUDENT_INTAKE_FIELDS,
+        academic_year=_STUDENT_ACYEAR_FIELDS,
+        student_year=_STUDENT_YEAR_FIELDS,
+    )
+
+
+def _staff_schema():
+    return _RecordSchema(
+        phone=_STAFF_PHONE_FIELDS,
+        full_name=_STAFF_FULLNAME_FIELDS,
+        first_name=_STAFF_FNAME_FIELDS,
+        last_name=_STAFF_LNAME_FIELDS,
+        department=_STAFF_DEPT_FIELDS,
+        department_code=_STAFF_DEPTCODE_FIELDS,
+        key=_STAFF_KEY_FIELDS,
+        gender=_STAFF_GENDER_FIELDS,
+        category=_STAFF_CATEGORY_FIELDS,
+        job_status=_STAFF_JOBSTATUS_FIELDS,
+    )
+
+
+def _parse_student_records(records, include_student, include_father, include_mother):
     """
-    Yield (name, phone) tuples from a single student JSON record.
+    Yield (name, phone) tuples from the student JSON records of one response.
     Respects the include_student/father/mother checkboxes.
     """
-    results = []
-    student_name = _first(rec, *_STUDENT_FNAME_FIELDS) or 'Student'
+    schema = _student_schema()
+    for rec in records:
+        student_name = schema.name(rec) or 'Student'
 
-    if include_student:
-        phone = _first(rec, *_STUDENT_PHONE_FIELDS)
-        if phone:
-            results.append((student_name, phone))
+        if include_student:
+            phone = schema.phone(rec)
+            if phone:
+                yield (student_name, phone)
 
-    if include_father:
-        phone = _first(rec, *_FATHER_PHONE_FIELDS)
-        if phone:
-            results.append((f"Father of {student_name}", phone))
+        if include_father:
+            phone = schema.father_phone(rec)
+            if phone:
+                yield (f"Father of {student_name}", phone)
 
-    if include_mother:
-        phone = _first(rec, *_MOTHER_PHONE_FIELDS)
-        if phone:
-            results.append((f"Mother of {student_name}", phone))
+        if include_mother:
+            phone = schema.mother_phone(rec)
+            if phone:
+                yield (f"Mother of {student_name}", phone)
 
-    return results
 
-
-def _parse_staff_record(rec):
+def _parse_staff_record(rec, schema):
     """Return (name, phone) from a single staff JSON record, or None if no phone."""
-    phone = _first(rec, *_STAFF_PHONE_FIELDS)
+    phone = schema.phone(rec)
     if not phone:
         return None
     # Build name from parts or full name field
-    name = _first(rec, *_STAFF_FULLNAME_FIELDS)
+    name = schema.full_name(rec)
     if not name:
-        first = _first(rec, *_STAFF_FNAME_FIELDS)
-        last  = _first(rec, *_STAFF_LNAME_FIELDS)
+        first = schema.first_name(rec)
+        last  = schema.last_name(rec)
         name  = f"{first} {last}".strip() or 'Staff'
     return (name, phone)
 
 
+def _parse_staff_records(records):
+    """Yield (name, phone) tuples from the staff JSON records of one response."""
+    schema = _staff_schema()
+    for rec in records:
+        pair = _parse_staff_record(rec, schema)
+        if pair:
+            yield pair
+
+
+def _text_chunks(text, size=STREAM_CHUNK_SIZE):
+    """Encode ``text`` slice by slice, for replaying a cached body."""
+    for start in range(0, len(text), size):
+        yield text[start:start + size].encode('utf-8')
+
+
+class WebServiceStreamError(Exception):
+    """Raised while iterating a juba response that broke off or is not valid JSON."""
+
+
 def _staff_base_url(staff_dataservice_url):
     """
     Derive staff base from the getStaffByUsername URL.
@@ -127,7 +231,7 @@ class SuSmsWebService:
 
     Usage (from wizard):
         ws = SuSmsWebService(env)
-        pairs = ws.get_students(school='SBS', program='BBS', ...)
+        pairs = ws.get_students(school='SBS', program='BBS', ...)   # iterable, consume once
         pairs = ws.get_staff(department='ICTD', gender='M')
     """
 
@@ -165,6 +269,11 @@ class SuSmsWebService:
     def use_mock(self):
         return self._cfg.get_param('su_sms.webservice_use_mock', default='false').lower() == 'true'
 
+    @property
+    def use_directory(self):
+        """Answer staff/student queries from the local mirror ('mirror') or juba ('live')."""
+        return self._cfg.get_param('su_sms.directory_source', default='mirror') == 'mirror'
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
@@ -176,12 +285,26 @@ class SuSmsWebService:
         """
         Fetch student recipient list.
 
-        Returns list of (name, phone) tuples.
+        Returns an iterable of (name, phone) tuples: a list from the mirror
+        or mock data, otherwise an iterator streamed from juba (see
+        _stream_recipients) - consume it once.
         Calls getStudentsModular when modular=True, getStudentsAcademic otherwise.
         """
         if self.use_mock:
             return self._mock_students(include_students, include_fathers, include_mothers)
 
+        directory_filters = None
+        if not modular:
+            # The mirror holds the academic listing; modular queries stay live
+            directory_filters = dict(
+                school=school, program=program, course=course, academic_year=academic_year,
+                student_year=student_year, intake=intake, include_students=include_students,
+                include_fathers=include_fathers, include_mothers=include_mothers,
+            )
+            results = self._directory_lookup('su.sms.directory.student', directory_filters)
+            if results is not None:
+                return results
+
         endpoint = self.student_base + ('getStudentsModular' if modular else 'getStudentsAcademic')
 
         params = {}
@@ -194,38 +317,41 @@ class SuSmsWebService:
         if enrolment_period:params['enrolmentPeriod'] = enrolment_period
         if module:          params['module']          = module
 
-        records = self._get_json(endpoint, params)
-        if records is None:
-            raise UserError(_(
+        records = self._iter_json(endpoint, params, cache=get_ws_cache(self.env))
+        return self._stream_recipients(
+            records and _parse_student_records(
+                records, include_students, include_fathers, include_mothers
+            ),
+            fallback=lambda: directory_filters and self._directory_lookup(
+                'su.sms.directory.student', directory_filters, allow_stale=True),
+            endpoint=endpoint,
+            unavailable=_(
                 "Could not retrieve student data from the web service.\n"
                 "Please check your network connection or contact ICT Services."
-            ))
-
-        results = []
-        for rec in records:
-            results.extend(_parse_student_record(
-                rec, include_students, include_fathers, include_mothers
-            ))
-
-        if not results:
-            raise UserError(_(
+            ),
+            empty=_(
                 "No students found matching the selected filters.\n"
                 "Please broaden your selection and try again."
-            ))
-
-        _logger.info("SU WS: fetched %d student recipients from %s", len(results), endpoint)
-        return results
+            ),
+        )
 
     def get_staff(self, department=None, gender=None, category=None, job_status=None):
         """
         Fetch staff recipient list.
 
-        Returns list of (name, phone) tuples.
+        Returns an iterable of (name, phone) tuples, as get_students.
         Uses getStaffBy with params if any filter set, else getAllStaff.
         """
         if self.use_mock:
             return self._mock_staff()
 
+        directory_filters = dict(
+            department=department, gender=gender, category=category, job_status=job_status,
+        )
+        results = self._directory_lookup('su.sms.directory.staff', directory_filters)
+        if results is not None:
+            return results
+
         params = {}
         if department:  params['department']   = department
         if gender and gender != 'all':
@@ -235,27 +361,59 @@ class SuSmsWebService:
 
         endpoint = self.staff_base + ('getStaffBy' if params else 'getAllStaff')
 
-        records = self._get_json(endpoint, params)
-        if records is None:
-            raise UserError(_(
+        records = self._iter_json(endpoint, params, cache=get_ws_cache(self.env))
+        return self._stream_recipients(
+            records and _parse_staff_records(records),
+            fallback=lambda: self._directory_lookup(
+                'su.sms.directory.staff', directory_filters, allow_stale=True),
+            endpoint=endpoint,
+            unavailable=_(
                 "Could not retrieve staff data from the web service.\n"
                 "Please check your network connection or contact ICT Services."
-            ))
-
-        results = []
-        for rec in records:
-            pair = _parse_staff_record(rec)
-            if pair:
-                results.append(pair)
-
-        if not results:
-            raise UserError(_(
+            ),
+            empty=_(
                 "No staff members found matching the selected filters.\n"
                 "Please broaden your selection and try again."
-            ))
+            ),
+        )
 
-        _logger.info("SU WS: fetched %d staff recipients from %s", len(results), endpoint)
-        return results
+    def _stream_recipients(self, pairs, fallback, endpoint, unavailable, empty):
+        """
+        Return an iterator over the (name, phone) ``pairs`` parsed from a
+        streamed juba response, without collecting them.
+
+        The first pair is read eagerly, so an unreachable service, a body
+        that breaks off before any record, or an empty result still surface
+        here - where the stale directory mirror (``fallback``) can answer
+        instead - with the ``unavailable`` / ``empty`` UserErrors. A failure
+        later in the stream raises ``unavailable`` from the iterator; the
+        caller's transaction then rolls back whatever it inserted.
+        """
+        first = None
+        if pairs is not None:
+            try:
+                first = next(pairs, None)
+            except WebServiceStreamError:
+                pairs = None
+        if pairs is None:
+            results = fallback()
+            if results is not None:
+                return results
+            raise UserError(unavailable)
+        if first is None:
+            raise UserError(empty)
+        return self._iter_stream(first, pairs, endpoint, unavailable)
+
+    def _iter_stream(self, first, pairs, endpoint, unavailable):
+        yield first
+        count = 1
+        try:
+            for pair in pairs:
+                count += 1
+                yield pair
+        except WebServiceStreamError as exc:
+            raise UserError(unavailable) from exc
+        _logger.info("SU WS: fetched %d recipients from %s", count, endpoint)
 
     def lookup_staff_by_username(self, username):
         """
@@ -293,38 +451,186 @@ class SuSmsWebService:
             _logger.warning("SU WS: lookup_staff_by_username failed for %s: %s", username, exc)
             return None
 
+    # ------------------------------------------------------------------
+    # Directory mirror
+    # ------------------------------------------------------------------
+    def _directory_lookup(self, model_name, filters, allow_stale=False):
+        """
+        Recipients from the local directory mirror, or None to go live.
+        A fresh mirror answers directly; a stale one only when juba failed
+        (``allow_stale``), so sends keep working through an outage.
+
+        A fresh mirror with no match also goes live: filter values are free
+        text and the mirror may not hold them the way juba matches them.
+        """
+        if not self.use_directory:
+            return None
+        directory = self.env[model_name].sudo()
+        last_sync = directory._get_last_sync()
+        if not last_sync or not (allow_stale or directory._is_fresh()):
+            return None
+        results = directory._find_recipients(**filters)
+        if allow_stale:
+            _logger.warning(
+                "SU WS: juba unavailable - using %s mirror from %s", directory._directory_kind, last_sync,
+            )
+        if not results:
+            if not allow_stale:
+                _logger.info(
+                    "SU WS: no match in the %s mirror - asking juba", directory._directory_kind,
+                )
+                return None
+            raise UserError(_(
+                "No recipients found matching the selected filters.\n"
+                "Please broaden your selection and try again."
+            ))
+        _logger.info("SU WS: %d recipients from the %s mirror", len(results), directory._directory_kind)
+        return results
+
+    def fetch_directory(self, kind):
+        """
+        Full staff or academic student listing for the mirror sync, as a
+        record iterator (may raise WebServiceStreamError), or None.
+        """
+        if kind == 'staff':
+            endpoint = self.staff_base + 'getAllStaff'
+        else:
+            endpoint = self.student_base + 'getStudentsAcademic'
+        return self._iter_json(endpoint, {})
+
+    @staticmethod
+    def staff_directory_rows(records):
+        """Mirror rows for a staff listing; records without a phone are skipped."""
+        schema = _staff_schema()
+        for rec in records:
+            pair = _parse_staff_record(rec, schema)
+            if not pair:
+                continue
+            name, phone = pair
+            department = schema.department(rec)
+            yield {
+                'ext_key':    schema.key(rec) or f"{name}|{phone}|{department}",
+                'name':       name,
+                'phone':      phone,
+                'department': department,
+                'department_code': schema.department_code(rec),
+                'gender':     schema.gender(rec)[:1].upper(),
+                'category':   schema.category(rec),
+                'job_status': schema.job_status(rec),
+            }
+
+    @staticmethod
+    def student_directory_rows(records):
+        """Mirror rows for a student listing (student and parent phones)."""
+        schema = _student_schema()
+        for rec in records:
+            name = schema.name(rec) or 'Student'
+            phone = schema.phone(rec)
+            father_phone = schema.father_phone(rec)
+            mother_phone = schema.mother_phone(rec)
+            if not (phone or father_phone or mother_phone):
+                continue
+            yield {
+                'ext_key':       schema.key(rec) or f"{name}|{phone}|{father_phone}|{mother_phone}",
+                'name':          name,
+                'phone':         phone,
+                'father_phone':  father_phone,
+                'mother_phone':  mother_phone,
+                'school':        schema.school(rec),
+                'program':       schema.program(rec),
+                'course':        schema.course(rec),
+                'intake':        schema.intake(rec),
+                'academic_year': schema.academic_year(rec),
+                'student_year':  schema.student_year(rec),
+            }
+
     # ------------------------------------------------------------------
     # Internal HTTP helper
     # ------------------------------------------------------------------
-    def _get_json(self, endpoint, params=None):
+    def _iter_json(self, endpoint, params=None, cache=None):
         """
-        GET request returning parsed JSON list/dict, or None on network error.
-        Logs but does not raise network-level exceptions.
+        GET request returning an iterator over the response records, parsed
+        incrementally (tools/json_stream.py), or None on network error.
+        Logs but does not raise network-level exceptions; failures while the
+        body is being read raise WebServiceStreamError from the iterator.
+
+        With ``cache`` (tools/ws_cache.py) a fresh cached body is replayed
+        instead, and a fully read response body is stored for the next call.
+
+        Returns None straight away while the juba circuit breaker is open,
+        so an outage does not make every caller wait out its own timeout.
         """
+        if cache is not None:
+            payload = cache.get(endpoint, params)
+            if payload is not None:
+                _logger.debug("SU WS cache hit for %s params=%s", endpoint, params)
+                return iter_json_records(_text_chunks(payload))
+
+        breaker = get_juba_circuit_breaker(self.env)
+        if not breaker.allow():
+            _logger.warning("SU WS: circuit open - not calling %s", endpoint)
+            return None
         try:
             _logger.debug("SU WS GET %s params=%s", endpoint, params)
-            resp = requests.get(endpoint, params=params or {}, timeout=self.timeout)
+            resp = requests.get(endpoint, params=params or {}, timeout=self.timeout, stream=True)
             resp.raise_for_status()
-            data = resp.json()
-            # Normalise: endpoint may wrap array in e.g. {"data": [...]} or {"students": [...]}
-            if isinstance(data, list):
-                return data
-            for key in ('data', 'students', 'staff', 'results', 'records'):
-                if key in data and isinstance(data[key], list):
-                    return data[key]
-            # Single-item dict - wrap in list
-            if isinstance(data, dict):
-                return [data]
-            return data
         except requests.exceptions.HTTPError as exc:
             _logger.error("SU WS HTTP error %s for %s: %s", exc.response.status_code, endpoint, exc)
-        except requests.exceptions.Timeout:
+            if exc.response.status_code >= 500:
+                breaker.record_failure(exc)
+            else:
+                breaker.record_success()  # juba answered: the service itself is up
+            exc.response.close()
+            return None
+        except requests.exceptions.Timeout as exc:
             _logger.error("SU WS timeout reaching %s", endpoint)
+            breaker.record_failure(exc)
+            return None
         except requests.exceptions.ConnectionError as exc:
             _logger.error("SU WS connection error for %s: %s", endpoint, exc)
+            breaker.record_failure(exc)
+            return None
         except Exception as exc:
             _logger.error("SU WS unexpected error for %s: %s", endpoint, exc)
-        return None
+            breaker.record_failure(exc)
+            return None
+        return self._stream_records(resp, endpoint, params, breaker, cache)
+
+    def _stream_records(self, resp, endpoint, params, breaker, cache):
+        """
+        Yield records from ``resp``; settle breaker and cache once fully read.
+        The body is only buffered for the cache up to cache.max_bytes; larger
+        responses are streamed without being cached.
+        """
+        body = [] if cache is not None and cache.enabled else None
+        body_size = 0
+
+        def chunks():
+            nonlocal body, body_size
+            for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if body is not None:
+                    body_size += len(chunk)
+                    if body_size > cache.max_bytes:
+                        _logger.debug("SU WS: %s too large to cache, streaming only", endpoint)
+                        body = None
+                    else:
+                        body.append(chunk)
+                yield chunk
+
+        count = 0
+        try:
+            for record in iter_json_records(chunks()):
+                count += 1
+                yield record
+        except (RequestException, ValueError) as exc:
+            _logger.error("SU WS error reading %s: %s", endpoint, exc)
+            breaker.record_failure(exc)
+            raise WebServiceStreamError(str(exc)) from exc
+        finally:
+            resp.close()
+        breaker.record_success()
+        if body is not None:
+            cache.put(endpoint, params, b''.join(body).decode('utf-8', errors='replace'), count)
 
     # ------------------------------------------------------------------
     # Mock data (used when su_sms.webservice_use_mock = true)
@@ -336,10 +642,7 @@ class SuSmsWebService:
             {'name': 'Bob Mwangi',   'phone': '+254711000002', 'fatherPhone': '+254722000002', 'motherPhone': '+254733000002'},
             {'name': 'Carol Odhiambo','phone': '+254711000003','fatherPhone': '+254722000003', 'motherPhone': '+254733000003'},
         ]
-        results = []
-        for rec in rows:
-            results.extend(_parse_student_record(rec, include_students, include_fathers, include_mothers))
-        return results
+        return list(_parse_student_records(rows, include_students, include_fathers, include_mothers))
 
     def _mock_staff(self):
         _logger.warning("SU WS: using MOCK staff data - disable su_sms.webservice_use_mock in production")
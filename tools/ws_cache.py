@@ -0,0 +1,137 @@
+# tools/ws_cache.py
+
+"""
+Shared TTL cache for juba data service responses (get_students/get_staff).
+
+Admins often message the same cohort several times within minutes and
+getAllStaff is slow, so the raw JSON body of each response is kept in the
+su_sms_ws_cache table, keyed by endpoint + query parameters. The table is
+read and written on a short-lived cursor of its own: every worker shares the
+entries, and a send that fails later (UserError, rollback) still keeps them.
+
+Settings (system parameters):
+  su_sms.ws_cache_ttl          - seconds an entry is served (default 600, 0 disables)
+  su_sms.ws_cache_max_entries  - entries kept; least recently used go first (default 50)
+
+Bodies over WS_CACHE_MAX_BYTES are not cached (see SuSmsWebService._stream_records).
+
+Each entry counts its hits and misses (see su.sms.ws.cache.get_cache_metrics).
+Invalidate from SU SMS > Administration > Data Service Cache, or with
+invalidate_ws_cache(env).
+"""
+
+import hashlib
+import json
+import logging
+
+from odoo.sql_db import db_connect
+
+_logger = logging.getLogger(__name__)
+
+WS_CACHE_TTL = 600
+WS_CACHE_MAX_ENTRIES = 50
+# Larger response bodies are streamed without being cached, so caching never
+# holds a whole-school pull in memory
+WS_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+
+def get_ws_cache_settings(env):
+    """Return (ttl_seconds, max_entries) from system parameters."""
+    cfg = env['ir.config_parameter'].sudo()
+    try:
+        ttl = int(cfg.get_param('su_sms.ws_cache_ttl', WS_CACHE_TTL))
+        max_entries = int(cfg.get_param('su_sms.ws_cache_max_entries', WS_CACHE_MAX_ENTRIES))
+    except (ValueError, TypeError):
+        ttl, max_entries = WS_CACHE_TTL, WS_CACHE_MAX_ENTRIES
+    return max(ttl, 0), max(max_entries, 1)
+
+
+class WebServiceCache:
+
+    def __init__(self, dbname, ttl=WS_CACHE_TTL, max_entries=WS_CACHE_MAX_ENTRIES):
+        self.dbname      = dbname
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.max_bytes   = WS_CACHE_MAX_BYTES
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    @staticmethod
+    def make_key(endpoint, params):
+        raw = json.dumps([endpoint, params or {}], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, endpoint, params=None):
+        """Return the cached response body (JSON text) for this request, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = self.make_key(endpoint, params)
+        with db_connect(self.dbname).cursor() as cr:
+            cr.execute("""
+                UPDATE su_sms_ws_cache
+                   SET hit_count = hit_count + 1,
+                       last_hit_at = clock_timestamp() AT TIME ZONE 'UTC'
+                 WHERE key = %s
+                   AND expires_at > clock_timestamp() AT TIME ZONE 'UTC'
+             RETURNING payload
+            """, [key])
+            row = cr.fetchone()
+        return row[0] if row else None
+
+    def put(self, endpoint, params, payload, record_count):
+        """Store ``payload`` (a body just refetched) and evict beyond max_entries."""
+        if not self.enabled:
+            return
+        key = self.make_key(endpoint, params)
+        with db_connect(self.dbname).cursor() as cr:
+            cr.execute("""
+                INSERT INTO su_sms_ws_cache (
+                    key, endpoint, params, payload, record_count, size_bytes,
+                    fetched_at, expires_at, hit_count, miss_count
+                )
+                VALUES (%s, %s, %s, %s, %s, %s,
+                        clock_timestamp() AT TIME ZONE 'UTC',
+                        clock_timestamp() AT TIME ZONE 'UTC' + make_interval(secs => %s),
+                        0, 1)
+                ON CONFLICT (key) DO UPDATE
+                   SET payload = EXCLUDED.payload,
+                       record_count = EXCLUDED.record_count,
+                       size_bytes = EXCLUDED.size_bytes,
+                       fetched_at = EXCLUDED.fetched_at,
+                       expires_at = EXCLUDED.expires_at,
+                       miss_count = su_sms_ws_cache.miss_count + 1
+            """, [
+                key, endpoint, json.dumps(params or {}, sort_keys=True), payload,
+                record_count, len(payload), self.ttl,
+            ])
+            cr.execute("""
+                DELETE FROM su_sms_ws_cache
+                 WHERE id IN (
+                    SELECT id
+                      FROM su_sms_ws_cache
+                     ORDER BY COALESCE(last_hit_at, fetched_at) DESC
+                    OFFSET %s
+                 )
+            """, [self.max_entries])
+            if cr.rowcount:
+                _logger.debug("SU WS cache: evicted %d entries", cr.rowcount)
+
+    def invalidate(self, endpoint=None):
+        """Drop every entry, or only those of ``endpoint``."""
+        with db_connect(self.dbname).cursor() as cr:
+            if endpoint:
+                cr.execute("DELETE FROM su_sms_ws_cache WHERE endpoint = %s", [endpoint])
+            else:
+                cr.execute("DELETE FROM su_sms_ws_cache")
+            return cr.rowcount
+
+
+def get_ws_cache(env):
+    ttl, max_entries = get_ws_cache_settings(env)
+    return WebServiceCache(env.cr.dbname, ttl=ttl, max_entries=max_entries)
+
+
+def invalidate_ws_cache(env, endpoint=None):
+    return get_ws_cache(env).invalidate(endpoint)
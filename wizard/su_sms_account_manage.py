@@ -40,6 +40,30 @@ class SuSmsAccountManage(models.TransientModel):
         related='company_id.at_environment',
         readonly=False,
     )
+    at_send_concurrency = fields.Integer(
+        related='company_id.at_send_concurrency',
+        readonly=False,
+    )
+    at_transport = fields.Selection(
+        related='company_id.at_transport',
+        readonly=False,
+    )
+    at_send_engine = fields.Selection(
+        related='company_id.at_send_engine',
+        readonly=False,
+    )
+    at_async_window = fields.Integer(
+        related='company_id.at_async_window',
+        readonly=False,
+    )
+    at_rate_messages = fields.Integer(
+        related='company_id.at_rate_messages',
+        readonly=False,
+    )
+    at_rate_requests = fields.Integer(
+        related='company_id.at_rate_requests',
+        readonly=False,
+    )
     test_number = fields.Char("Test Number", help="Number to send a test SMS to, e.g. +254727374660")
 
     def action_check_balance(self):
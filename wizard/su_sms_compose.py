@@ -25,18 +25,38 @@ involved in the Selection cache validation path.
 ==========================================================================
 """
 
-import base64
-import csv
-import io
+import itertools
+import json
 import logging
 
+from markupsafe import escape
+
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError
 
+from odoo.addons.su_sms_integrated.tools.csv_stream import (
+    get_field_attachment,
+    has_binary_value,
+    iter_csv_recipients,
+    open_binary_stream,
+)
+from odoo.addons.su_sms_integrated.tools.recipient_cache import (
+    cache_recipients,
+    get_cached_recipients,
+    iter_and_cache_recipients,
+    recipient_cache_key,
+    summarize_recipients,
+)
 from odoo.addons.su_sms_integrated.tools.webservice import SuSmsWebService
 
 _logger = logging.getLogger(__name__)
 
+# Rows rendered in the compose preview table
+PREVIEW_ROWS = 50
+
+# Seconds a previewed staff/student list is reused (preview -> send)
+WEBSERVICE_PREVIEW_MAX_AGE = 600
+
 
 class SuSmsCompose(models.TransientModel):
     _name = 'su.sms.compose'
@@ -52,7 +72,10 @@ class SuSmsCompose(models.TransientModel):
         ('student', 'Student SMS'),
     ], string='SMS Type', required=True, default='manual')
 
-    body = fields.Text(string='Message Body', required=True)
+    body = fields.Text(
+        string='Message Body', required=True,
+        help="{name} and {phone} are replaced per recipient.",
+    )
 
     administrator_id = fields.Many2one(
         'su.sms.administrator',
@@ -134,6 +157,10 @@ class SuSmsCompose(models.TransientModel):
         compute='_compute_preview',
         string='Recipient Count',
     )
+    directory_freshness = fields.Char(
+        compute='_compute_directory_freshness',
+        string='Directory Freshness',
+    )
 
     # ------------------------------------------------------------------
     # Defaults
@@ -160,22 +187,20 @@ class SuSmsCompose(models.TransientModel):
     @api.depends('sms_type', 'manual_numbers', 'csv_file')
     def _compute_preview(self):
         for rec in self:
-            numbers = []
-            if rec.sms_type == 'manual':
-                numbers = rec._parse_manual_numbers()
-            elif rec.sms_type == 'adhoc':
-                numbers = rec._parse_csv_numbers()
-
-            rec.recipient_count = len(numbers)
-            if numbers:
+            head, count = [], 0
+            if rec.sms_type in ('manual', 'adhoc'):
+                head, count = rec._get_recipient_summary(PREVIEW_ROWS)
+
+            rec.recipient_count = count
+            if head:
                 rows = ''.join(
-                    f'<tr><td>{i + 1}</td><td>{n[0]}</td><td>{n[1]}</td></tr>'
-                    for i, n in enumerate(numbers[:50])
+                    f'<tr><td>{i + 1}</td><td>{escape(n[0])}</td><td>{escape(n[1])}</td></tr>'
+                    for i, n in enumerate(head)
                 )
                 more = (
                     f'<tr><td colspan="3" class="text-muted">'
-                    f'… and {len(numbers) - 50} more</td></tr>'
-                    if len(numbers) > 50 else ''
+                    f'… and {count - len(head)} more</td></tr>'
+                    if count > len(head) else ''
                 )
                 rec.preview_html = (
                     '<table class="table table-sm table-bordered">'
@@ -193,6 +218,107 @@ class SuSmsCompose(models.TransientModel):
             else:
                 rec.preview_html = '<p class="text-muted">No recipients yet.</p>'
 
+    @api.depends('sms_type')
+    def _compute_directory_freshness(self):
+        """Age of the local staff/student mirror the send will be answered from."""
+        use_mirror = self.env['ir.config_parameter'].sudo().get_param(
+            'su_sms.directory_source', 'mirror') == 'mirror'
+        for rec in self:
+            rec.directory_freshness = ''
+            if rec.sms_type not in ('staff', 'student') or not use_mirror:
+                continue
+            directory = self.env[f'su.sms.directory.{rec.sms_type}'].sudo()
+            last_sync = directory._get_last_sync()
+            if not last_sync:
+                rec.directory_freshness = _("Local directory not synced yet - juba will be queried live.")
+            elif directory._is_fresh():
+                rec.directory_freshness = _(
+                    "Answered from the local directory, synced %s.",
+                    fields.Datetime.to_string(fields.Datetime.context_timestamp(self, last_sync)),
+                )
+            else:
+                rec.directory_freshness = _(
+                    "Local directory is stale (synced %s) - juba will be queried live.",
+                    fields.Datetime.to_string(fields.Datetime.context_timestamp(self, last_sync)),
+                )
+
+    # ------------------------------------------------------------------
+    # Parsed recipient cache (manual / adhoc)
+    # ------------------------------------------------------------------
+    def _recipient_cache_key(self):
+        if self.sms_type == 'manual':
+            return recipient_cache_key('manual', self.manual_numbers or '')
+        # A saved upload is keyed on its attachment checksum, so the file is
+        # not loaded just to hash it; an unsaved one is already in memory
+        attachment = get_field_attachment(self, 'csv_file')
+        if attachment.checksum:
+            return f"adhoc:{attachment.checksum}"
+        return recipient_cache_key('adhoc', self.csv_file or b'')
+
+    def _iter_recipients(self):
+        """Parse the manual list or the CSV upload from scratch."""
+        if self.sms_type == 'manual':
+            return iter(self._parse_manual_numbers())
+        return self._iter_csv_numbers()
+
+    def _get_cached_recipients(self, populate=True):
+        """
+        Tuple of parsed (name, number) pairs for the current input, parsed at
+        most once per content hash and worker. None when the input is too
+        large to cache (or not cached yet and ``populate`` is False).
+        """
+        key = self._recipient_cache_key()
+        pairs = get_cached_recipients(key)
+        if pairs is None and populate:
+            pairs = cache_recipients(key, self._iter_recipients())
+        return pairs
+
+    def _get_recipient_summary(self, limit):
+        """(first ``limit`` pairs, total count) - streamed when not cacheable."""
+        pairs = self._get_cached_recipients()
+        if pairs is None:
+            return summarize_recipients(self._iter_recipients(), limit)
+        return list(pairs[:limit]), len(pairs)
+
+    def _get_webservice_recipients(self):
+        """
+        Staff / student recipients from the data service, shared between the
+        preview endpoint and action_send for WEBSERVICE_PREVIEW_MAX_AGE.
+        A miss streams the service response (iterate once); it is cached
+        when fully read and small enough.
+        """
+        params = self._get_webservice_params()
+        key = recipient_cache_key(self.sms_type, json.dumps(params, sort_keys=True))
+        pairs = get_cached_recipients(key, max_age=WEBSERVICE_PREVIEW_MAX_AGE)
+        if pairs is None:
+            pairs = iter_and_cache_recipients(key, self._fetch_recipients_from_webservice(params))
+        return pairs
+
+    def _get_preview_page(self, offset=0, limit=PREVIEW_ROWS, search=None):
+        """
+        One page of the recipient list for any SMS type, for the
+        /su_sms/recipient_preview endpoint. Requires the same rights (and
+        staff department scope) as sending.
+        """
+        self.ensure_one()
+        self._check_sms_access()
+        if self.sms_type in ('staff', 'student'):
+            pairs = self._get_webservice_recipients()
+        else:
+            pairs = self._get_cached_recipients()
+            if pairs is None:
+                pairs = self._iter_recipients()
+        page, total = summarize_recipients(pairs, limit, offset=offset, search=search)
+        return {
+            'total':   total,
+            'offset':  offset,
+            'limit':   limit,
+            'records': [
+                {'index': offset + i + 1, 'name': name, 'number': number}
+                for i, (name, number) in enumerate(page)
+            ],
+        }
+
     # ------------------------------------------------------------------
     # Number parsers
     # ------------------------------------------------------------------
@@ -202,51 +328,18 @@ class SuSmsCompose(models.TransientModel):
         raw = self.manual_numbers.replace('\n', ',').replace(';', ',')
         return [('', n.strip()) for n in raw.split(',') if n.strip()]
 
-    def _parse_csv_numbers(self):
+    def _iter_csv_numbers(self):
         """
+        Lazily yield (name, number) pairs from the uploaded CSV, normalised
+        (see tools/csv_stream.py). Repeated numbers are kept: the send merges
+        them (names, row count) in _bulk_insert_recipients.
         Supports new template (firstname, lastname, phone_number, mobile_number)
         and legacy format (Name, Phone Number).
         phone_number is preferred; mobile_number used as fallback if blank.
         """
-        if not self.csv_file:
-            return []
-        try:
-            data   = base64.b64decode(self.csv_file)
-            reader = csv.DictReader(
-                io.StringIO(data.decode('utf-8', errors='replace'))
-            )
-            results = []
-            for row in reader:
-                firstname = (
-                    row.get('firstname') or row.get('first_name') or ''
-                ).strip()
-                lastname = (
-                    row.get('lastname') or row.get('last_name') or ''
-                ).strip()
-                if firstname or lastname:
-                    name = f"{firstname} {lastname}".strip()
-                else:
-                    name = (row.get('Name') or row.get('name') or '').strip()
-
-                phone = (
-                    row.get('phone_number') or
-                    row.get('Phone Number') or
-                    row.get('Phone') or
-                    row.get('phone') or ''
-                ).strip()
-                if not phone:
-                    phone = (
-                        row.get('mobile_number') or
-                        row.get('Mobile Number') or
-                        row.get('mobile') or ''
-                    ).strip()
-
-                if phone:
-                    results.append((name, phone))
-            return results
-        except Exception as exc:
-            _logger.warning("SU SMS CSV parse error: %s", exc)
-            return []
+        if not has_binary_value(self, 'csv_file'):
+            return iter(())
+        return iter_csv_recipients(open_binary_stream(self, 'csv_file'), dedupe=False)
 
     # ------------------------------------------------------------------
     # CSV template download
@@ -364,36 +457,42 @@ class SuSmsCompose(models.TransientModel):
     # ------------------------------------------------------------------
     # Web service fetch
     # ------------------------------------------------------------------
-    def _fetch_recipients_from_webservice(self):
-        ws = SuSmsWebService(self.env)
-
+    def _get_webservice_params(self):
+        """Keyword arguments for get_staff / get_students from the filters."""
         if self.sms_type == 'staff':
-            return ws.get_staff(
-                department=self._resolve_staff_department_filter(),
-                gender=self.staff_gender,
-                category=self.staff_category    or None,
-                job_status=self.staff_job_status or None,
-            )
+            return {
+                'department': self._resolve_staff_department_filter(),
+                'gender':     self.staff_gender,
+                'category':   self.staff_category    or None,
+                'job_status': self.staff_job_status or None,
+            }
 
         if self.sms_type == 'student':
-            return ws.get_students(
-                school=self.student_school                     or None,
-                program=self.student_program                   or None,
-                course=self.student_course                     or None,
-                student_year=self.student_year                 or None,
-                enrolment_period=self.student_enrolment_period or None,
-                module=self.student_module                     or None,
-                intake=self.student_intake                     or None,
-                include_students=self.include_students,
-                include_fathers=self.include_fathers,
-                include_mothers=self.include_mothers,
-                modular=self.student_modular,
-            )
+            return {
+                'school':           self.student_school           or None,
+                'program':          self.student_program          or None,
+                'course':           self.student_course           or None,
+                'student_year':     self.student_year             or None,
+                'enrolment_period': self.student_enrolment_period or None,
+                'module':           self.student_module           or None,
+                'intake':           self.student_intake           or None,
+                'include_students': self.include_students,
+                'include_fathers':  self.include_fathers,
+                'include_mothers':  self.include_mothers,
+                'modular':          self.student_modular,
+            }
 
         raise UserError(
             _("Unknown SMS type '%s' for web service fetch.", self.sms_type)
         )
 
+    def _fetch_recipients_from_webservice(self, params=None):
+        ws = SuSmsWebService(self.env)
+        params = params or self._get_webservice_params()
+        if self.sms_type == 'staff':
+            return ws.get_staff(**params)
+        return ws.get_students(**params)
+
     # ------------------------------------------------------------------
     # Main send action
     # ------------------------------------------------------------------
@@ -411,17 +510,22 @@ class SuSmsCompose(models.TransientModel):
 
         self._enforce_credit_balance()
 
-        if self.sms_type == 'manual':
-            pairs = self._parse_manual_numbers()
-        elif self.sms_type == 'adhoc':
-            pairs = self._parse_csv_numbers()
+        if self.sms_type in ('manual', 'adhoc'):
+            # Usually already parsed by the preview; stream otherwise
+            pairs = self._get_cached_recipients(populate=False)
+            if pairs is None:
+                pairs = self._iter_recipients()
         else:
-            pairs = self._fetch_recipients_from_webservice()
+            pairs = self._get_webservice_recipients()
 
-        if not pairs:
+        # CSV pairs are streamed: peek at the first one instead of len()
+        pairs = iter(pairs)
+        first = next(pairs, None)
+        if first is None:
             raise UserError(
                 _("No valid phone numbers found. Please check your input.")
             )
+        pairs = itertools.chain([first], pairs)
 
         message = self.env['su.sms.message'].create({
             'body':             self.body,
@@ -444,15 +548,7 @@ class SuSmsCompose(models.TransientModel):
             'include_mothers':  self.include_mothers,
         })
 
-        self.env['su.sms.detail'].create([
-            {
-                'message_id':     message.id,
-                'recipient_name': name,
-                'phone_number':   number,
-                'status':         'pending',
-            }
-            for name, number in pairs
-        ])
+        self.env['su.sms.detail']._bulk_insert_recipients(message, pairs)
 
         message.action_send()
 